@@ -3,6 +3,8 @@ import sys
 import re
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import math
 import shutil
 import threading
@@ -11,8 +13,17 @@ import random
 import datetime
 import ipaddress
 import socket
+import functools
+import bisect
+import gzip
+import zlib
+import hashlib
+from collections import namedtuple
+from operator import attrgetter, itemgetter
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 from markupsafe import escape, Markup
+from jinja2 import DictLoader, FileSystemBytecodeCache
 # Try to import ZoneInfo for timezone support (Python 3.9+)
 try:
     from zoneinfo import ZoneInfo
@@ -20,8 +31,45 @@ except ImportError:
     # Fallback/Mock if missing (though standard in 3.11)
     ZoneInfo = None
 
+# orjson is optional; it parses and serializes the config/history files much
+# faster, but the stdlib json module works when it isn't installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Server-side sessions are optional too; without them Flask's signed cookie
+# sessions are used.
+try:
+    import redis
+    from flask_session import Session
+except ImportError:
+    redis = Session = None
+
+# Brotli is optional; responses fall back to gzip without it.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# argon2-cffi is optional; without it new passwords fall back to Werkzeug's
+# (much slower to verify) pbkdf2 hashes. Existing pbkdf2 hashes keep working.
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import InvalidHashError, VerificationError
+except ImportError:
+    PasswordHasher = None
+
+# waitress is optional; it serves requests from a thread pool in production.
+# Without it the app falls back to Werkzeug's (threaded) development server.
+try:
+    import waitress
+except ImportError:
+    waitress = None
+
 from datetime import timedelta
-from flask import Flask, render_template_string, request, redirect, flash, url_for, session, jsonify
+from flask.json.provider import DefaultJSONProvider
+from flask import Flask, render_template, stream_template, get_flashed_messages, request, redirect, flash, url_for, session, jsonify, send_file
 from plexapi.server import PlexServer
 from plexapi.exceptions import NotFound, Unauthorized
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -65,49 +113,107 @@ def get_encryption_key():
             f.write(key)
         return key
 
+def get_fernet():
+    """The Fernet instance for KEY_FILE, rebuilt only when the key file changes."""
+    return _fernet_for(file_stamp(KEY_FILE))
+
+@functools.lru_cache(maxsize=1)
+def _fernet_for(stamp):
+    return Fernet(get_encryption_key())
+
 def encrypt_val(value):
     """Encrypts a string value."""
     if not value: return ""
-    f = Fernet(get_encryption_key())
-    return f.encrypt(value.encode()).decode()
+    return get_fernet().encrypt(value.encode()).decode()
 
 def decrypt_val(token):
     """Decrypts a string value."""
     if not token: return ""
     try:
-        f = Fernet(get_encryption_key())
-        return f.decrypt(token.encode()).decode()
+        return get_fernet().decrypt(token.encode()).decode()
     except:
         return token
 
-def get_config():
-    if not os.path.exists(CONFIG_FILE):
-        return DEFAULT_CONFIG
+# --- File Caches ---
+# Parsed (and decrypted) config.json, reused until the file changes on disk.
+_cfg_cache = {'stamp': None, 'data': None, 'checked': 0}
+_CFG_RECHECK = 1.0  # Seconds between stat() calls for outside edits to config.json
+
+def file_stamp(path):
+    """Returns (mtime_ns, size) for a file, or None if it does not exist."""
     try:
-        with open(CONFIG_FILE, 'r') as f:
-            cfg = json.load(f)
-            for key, val in DEFAULT_CONFIG.items():
-                if key not in cfg:
-                    cfg[key] = val
-            
-            if cfg['PLEX_TOKEN']:
-                cfg['PLEX_TOKEN'] = decrypt_val(cfg['PLEX_TOKEN'])
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def read_json(path):
+    with open(path, 'rb') as f:
+        raw = f.read()
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+def write_json(path, obj):
+    if orjson:
+        raw = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        raw = json.dumps(obj, indent=2).encode('utf-8')
+    # Write to a sibling temp file and swap it in, so a crash mid-write
+    # never leaves a truncated config/history file behind.
+    # The name is per thread so concurrent saves can't share a temp file.
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(raw)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+
+def get_config(copy=True):
+    # get_config() runs several times per request (log_verbose included), so
+    # only look at the file again once _CFG_RECHECK has passed. Read-only
+    # callers pass copy=False to get the cached dict itself.
+    now = time.monotonic()
+    if _cfg_cache['data'] is not None and now - _cfg_cache['checked'] < _CFG_RECHECK:
+        return _cfg_cache['data'].copy() if copy else _cfg_cache['data']
+    stamp = file_stamp(CONFIG_FILE)
+    if stamp is None or stamp != _cfg_cache['stamp']:
+        # A missing or unreadable file means defaults, cached (as a copy, so
+        # callers can't edit DEFAULT_CONFIG) until the file changes.
+        cfg = dict(DEFAULT_CONFIG)
+        if stamp is not None:
+            try:
+                cfg = read_json(CONFIG_FILE)
+                for key, val in DEFAULT_CONFIG.items():
+                    if key not in cfg:
+                        cfg[key] = val
                 
-            return cfg
-    except:
-        return DEFAULT_CONFIG
+                if cfg['PLEX_TOKEN']:
+                    cfg['PLEX_TOKEN'] = decrypt_val(cfg['PLEX_TOKEN'])
+            except:
+                cfg = dict(DEFAULT_CONFIG)
+        _cfg_cache['data'] = cfg
+        _cfg_cache['stamp'] = stamp
+    _cfg_cache['checked'] = now
+    # Callers (e.g. settings) edit the dict before saving, so hand out a copy.
+    return _cfg_cache['data'].copy() if copy else _cfg_cache['data']
+
+# Wakes scheduler_loop() early when the config is saved.
+_cron_wakeup = threading.Event()
+_CRON_MAX_SLEEP = 900
 
 def save_config(new_config):
     cfg_to_save = new_config.copy()
     if cfg_to_save['PLEX_TOKEN']:
         cfg_to_save['PLEX_TOKEN'] = encrypt_val(cfg_to_save['PLEX_TOKEN'])
 
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(cfg_to_save, f, indent=2)
+    write_json(CONFIG_FILE, cfg_to_save)
+    # Write through so the next get_config() doesn't re-read and decrypt.
+    _cfg_cache.update(data=dict(DEFAULT_CONFIG, **new_config), stamp=file_stamp(CONFIG_FILE), checked=time.monotonic())
+    _cron_wakeup.set()
 
 def log_verbose(msg):
     """Global logging helper."""
-    cfg = get_config()
+    cfg = get_config(copy=False)
     if cfg.get('VERBOSE_LOGGING', False):
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"[{timestamp}] {msg}")
@@ -115,16 +221,114 @@ def log_verbose(msg):
 # ==========================================
 # 2. APP SETUP
 # ==========================================
+class OrjsonProvider(DefaultJSONProvider):
+    """Serves jsonify() and request.get_json() through orjson."""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+if orjson: app.json = OrjsonProvider(app)
 app.secret_key = os.urandom(24)
 app.permanent_session_lifetime = timedelta(hours=1)
+# With REDIS_URL set (and flask-session installed) the cookie only carries a
+# session id and the session data lives in Redis. Only that data moves there:
+# the secret key, the scheduler and all caches remain per process, so the
+# app still expects to run as a single process.
+if os.environ.get('REDIS_URL') and Session:
+    app.config.update(SESSION_TYPE='redis', SESSION_PERMANENT=True,
+                      SESSION_REDIS=redis.Redis.from_url(os.environ['REDIS_URL']))
+    Session(app)
+# Templates are string constants registered at import and never change, so
+# skip the per-render up-to-date check and never evict compiled templates.
+app.jinja_options = dict(Flask.jinja_options, auto_reload=False, cache_size=-1)
+# Otherwise FLASK_DEBUG=1 (app.run(debug=True)) switches auto_reload back on.
+app.config['TEMPLATES_AUTO_RELOAD'] = False
+# Compiled template bytecode is kept on disk (checked against the source), so
+# later starts skip compiling the pages again.
+JINJA_CACHE_DIR = os.path.join(DATA_DIR, 'cache', 'jinja')
+try:
+    os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+    app.jinja_options['bytecode_cache'] = FileSystemBytecodeCache(JINJA_CACHE_DIR)
+except OSError:
+    pass  # Read-only data dir; compile in memory as before
 # Enable Jinja2 HTML autoescaping globally so {{ var }} expressions in every
-# render_template_string call are safe from XSS without explicit |e filters.
+# rendered template are safe from XSS without explicit |e filters.
 app.jinja_env.autoescape = True
 
 # Global Plex Object
 plex = None
 
+# Shared pool for fanning out blocking Plex requests made while serving a page.
+plex_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='plex-io')
+
+# Shared HTTP session so poster downloads reuse keep-alive connections
+# instead of opening a new TCP/TLS connection per image. Transient gateway
+# errors are retried; every call passes HTTP_TIMEOUT so a hung Plex cannot
+# stall the cron thread.
+HTTP_TIMEOUT = (5, 30)  # (connect, read) seconds
+_http_retry = Retry(total=3, backoff_factor=0.2, status_forcelist=(502, 503, 504))
+http_session = requests.Session()
+http_session.mount('http://', HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=_http_retry))
+http_session.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=_http_retry))
+
+# Folder names by ratingKey. They only change when media is moved on disk,
+# so entries live until init_plex() reconnects (or the cache fills up).
+_folder_cache = {}
+_FOLDER_CACHE_MAX = 20000
+
+# Serialized /api/search responses: lowercased query -> (expires_at, json_bytes, etag).
+_search_cache = {}
+_SEARCH_CACHE_MAX = 512
+_SEARCH_CACHE_TTL = 60
+# Lets the browser reuse a result while retyping, for as long as the server would.
+_SEARCH_CACHE_CONTROL = f'private, max-age={_SEARCH_CACHE_TTL}'
+
+# Rating keys per bulk fetchItems() call; keeps the request URL a sane length.
+_FETCH_CHUNK = 500
+
+# Per-library "Already Downloaded" results: lib key -> (history keys, poster
+# index, done items by ratingKey, rendered list, history keys already
+# resolved against Plex, time of the last full fetch). The Plex objects are
+# refetched after _SECTIONS_TTL so renames, new artwork and deleted items show
+# up. See view_library.
+_done_cache = {}
+
+# lib title -> (poster index, {ratingKey: ((path ctx, season count), status)}).
+# A show's seasons() is a Plex round-trip, so file-based statuses are reused
+# until the library folder is rescanned or the show gains/loses seasons.
+_status_cache = {}
+
+# ratingKey -> (fetched_at, Plex item). Opening an item, then a season, then
+# downloading from it fetches the same objects within seconds of each other.
+_item_cache = {}
+_ITEM_TTL = 60
+_ITEM_CACHE_MAX = 2048
+
+# Library sections, refetched at most every _SECTIONS_TTL seconds. PlexAPI
+# caches the section list (and each section's totalSize) on plex.library
+# forever, so it is reloaded to pick up new libraries and item counts.
+_sections_cache = {'t': 0, 'v': None}
+_SECTIONS_TTL = 60
+# lib.key -> (fetched_at, "N Movies" / "N Shows, M Episodes") for the home page.
+_content_cache = {}
+
+def get_sections():
+    if _sections_cache['v'] is None or time.monotonic() - _sections_cache['t'] >= _SECTIONS_TTL:
+        if _sections_cache['v'] is not None:
+            try: plex.library.reload()
+            except Exception as e: log_verbose(f"Library reload failed: {e}")
+        _sections_cache['v'] = plex.library.sections()
+        _sections_cache['t'] = time.monotonic()
+    return _sections_cache['v']
+
+@functools.lru_cache(maxsize=64)
+def _section_title(section_id):
+    # Section titles rarely change; cleared whenever init_plex() reconnects.
+    return plex.library.sectionByID(section_id).title
+
 def init_plex():
     global plex
     cfg = get_config()
@@ -140,6 +344,14 @@ def init_plex():
         import plexapi
         plexapi.X_PLEX_IDENTIFIER = custom_id
 
+    _section_title.cache_clear()
+    _folder_cache.clear()
+    _search_cache.clear()
+    _done_cache.clear()
+    _status_cache.clear()
+    _item_cache.clear()
+    _sections_cache['v'] = None
+    _content_cache.clear()
     try:
         plex = PlexServer(url, token)
         print(f"Connected to Plex Server: {plex.friendlyName}")
@@ -157,23 +369,50 @@ init_plex()
 # 3. HELPER FUNCTIONS (CORE)
 # ==========================================
 
+# Substring -> badge label, checked in order.
+_PROVIDER_NAMES = (
+    ('themoviedb', "TMDB"), ('tmdb', "TMDB"),
+    ('thetvdb', "TVDB"), ('tvdb', "TVDB"),
+    ('imdb', "IMDB"),
+    ('fanart', "Fanart.tv"),
+    ('gracenote', "Plex/Gracenote"),
+    ('local', "Local"),
+    ('movieposterdb', "MoviePosterDB"),
+)
+
+@functools.lru_cache(maxsize=128)
 def format_provider(provider_str):
+    # Only a handful of distinct providers exist, so results are cached.
     if not provider_str: return "Upload"
     p = str(provider_str).lower()
-    if 'themoviedb' in p or 'tmdb' in p: return "TMDB"
-    if 'thetvdb' in p or 'tvdb' in p: return "TVDB"
-    if 'imdb' in p: return "IMDB"
-    if 'fanart' in p: return "Fanart.tv"
-    if 'gracenote' in p: return "Plex/Gracenote"
-    if 'local' in p: return "Local"
-    if 'movieposterdb' in p: return "MoviePosterDB"
+    for needle, label in _PROVIDER_NAMES:
+        if needle in p: return label
     if '.' in p: return p.split('.')[-1].title()
     return p.title()
 
+@functools.lru_cache(maxsize=128)
+def provider_key(provider):
+    """Lower-cased provider string for matching; cached like format_provider."""
+    return str(provider).lower()
+
+# Characters that are not allowed in file or folder names.
+_SANITIZE_RE = re.compile(r'[<>:"/\\|?*]')
+
+@functools.lru_cache(maxsize=256)
 def sanitize_filename(name):
-    return re.sub(r'[<>:"/\\|?*]', '', name).strip()
+    return _SANITIZE_RE.sub('', name).strip()
 
 def get_physical_folder_name(item):
+    rk = getattr(item, 'ratingKey', None)
+    name = _folder_cache.get(rk)
+    if name is None:
+        name = _resolve_folder_name(item)
+        if rk is not None and name not in ("Unknown_Folder", "Unknown_Type"):
+            if len(_folder_cache) >= _FOLDER_CACHE_MAX: _folder_cache.clear()
+            _folder_cache[rk] = name
+    return name
+
+def _resolve_folder_name(item):
     try:
         if item.type == 'movie':
             locations = item.locations
@@ -199,19 +438,34 @@ def get_physical_folder_name(item):
         return "Unknown_Folder"
     return "Unknown_Type"
 
-def get_target_file_path(item, lib_title=None, style=None, img_type='poster'):
-    cfg = get_config()
-    base_dir = cfg.get('DOWNLOAD_BASE_DIR', 'downloaded_posters')
-    current_style = style if style else cfg.get('ASSET_STYLE', 'ASSET_FOLDERS')
-    
-    if not os.path.isabs(base_dir) and DATA_DIR != '.':
-        base_dir = os.path.join(DATA_DIR, base_dir)
+@functools.lru_cache(maxsize=16)
+def resolve_data_path(path, basename_only=False):
+    """Anchors a relative config path under DATA_DIR. Cached since the config
+    values rarely change but are resolved for every item."""
+    if not os.path.isabs(path) and DATA_DIR != '.':
+        return os.path.join(DATA_DIR, os.path.basename(path) if basename_only else path)
+    return path
+
+def get_download_base_dir(cfg=None):
+    if cfg is None: cfg = get_config(copy=False)
+    return resolve_data_path(cfg.get('DOWNLOAD_BASE_DIR', 'downloaded_posters'))
+
+# Resolved download root and asset style, built once per request or batch.
+PathContext = namedtuple('PathContext', ['base_dir', 'style'])
+
+def path_context(cfg=None, style=None):
+    if cfg is None: cfg = get_config(copy=False)
+    return PathContext(get_download_base_dir(cfg), style or cfg.get('ASSET_STYLE', 'ASSET_FOLDERS'))
+
+def get_target_file_path(item, lib_title=None, style=None, img_type='poster', cfg=None, ctx=None):
+    if ctx is None: ctx = path_context(cfg, style)
+    base_dir, current_style = ctx
         
     if not lib_title:
-        if hasattr(item, 'section'): lib_title = item.section().title
-        elif hasattr(item, 'librarySectionID'):
-             lib = plex.library.sectionByID(item.librarySectionID)
-             lib_title = lib.title
+        # Plex includes librarySectionTitle on most items, which saves a lookup.
+        if getattr(item, 'librarySectionTitle', None): lib_title = item.librarySectionTitle
+        elif getattr(item, 'librarySectionID', None): lib_title = _section_title(int(item.librarySectionID))
+        elif hasattr(item, 'section'): lib_title = item.section().title
         else: lib_title = "Unknown_Library"
              
     clean_lib = sanitize_filename(lib_title)
@@ -234,37 +488,82 @@ def get_target_file_path(item, lib_title=None, style=None, img_type='poster'):
             return os.path.join(base_dir, clean_lib, folder_name, filename)
 
     elif item.type == 'season':
-        show = item.show()
-        show_folder = get_physical_folder_name(show)
-        season_idx = item.index
-        season_str = f"Season{season_idx:02d}"
-        if current_style == 'NO_ASSET_FOLDERS':
-            suffix = "" if img_type == 'poster' else "_background"
-            return os.path.join(base_dir, clean_lib, f"{show_folder}_{season_str}{suffix}.jpg")
-        else:
-            name = f"{season_str}.jpg" if img_type == 'poster' else f"{season_str}_background.jpg"
-            return os.path.join(base_dir, clean_lib, show_folder, name)
+        # Reuse the show's cached folder name to skip the item.show() request.
+        show_folder = _folder_cache.get(getattr(item, 'parentRatingKey', None))
+        if show_folder is None: show_folder = get_physical_folder_name(item.show())
+        return season_file_path(os.path.join(base_dir, clean_lib), show_folder, item.index, current_style, img_type)
     return None
 
-def check_file_exists(item, lib_title=None, img_type='poster'):
-    target_path = get_target_file_path(item, lib_title, img_type=img_type)
+def season_file_path(lib_dir, show_folder, season_idx, style, img_type='poster'):
+    """Path of a season image given its show's folder; no Plex lookups."""
+    season_str = f"Season{season_idx:02d}"
+    if style == 'NO_ASSET_FOLDERS':
+        suffix = "" if img_type == 'poster' else "_background"
+        return os.path.join(lib_dir, f"{show_folder}_{season_str}{suffix}.jpg")
+    name = f"{season_str}.jpg" if img_type == 'poster' else f"{season_str}_background.jpg"
+    return os.path.join(lib_dir, show_folder, name)
+
+@functools.lru_cache(maxsize=2048)
+def target_rel_dir(target_path, base_dir):
+    """Folder of target_path relative to base_dir, as the artwork pages show it."""
+    if not target_path: return "Unknown"
+    return os.path.relpath(os.path.dirname(target_path), base_dir)
+
+# lib_dir -> (mtime_ns, built_at, frozenset of paths), reused across requests.
+_poster_index_cache = {}
+_POSTER_INDEX_TTL = 60  # Seconds; catches edits inside subfolders made outside the app
+# lib_dir -> (mtime_ns, built_at, (posters, backgrounds, bytes)) for the home page stats.
+_disk_stats_cache = {}
+# lib_dir -> {folder: (mtime_ns, file paths, subfolders, (posters, backgrounds, bytes))}
+# so a rescan of the stats only lists folders whose contents changed.
+_dir_scan_cache = {}
+# Folder mtimes this close to the scan are not trusted (coarse SMB/FAT clocks).
+_MTIME_SLACK_NS = 2 * 10**9
+
+def build_existing_poster_index(base_dir, lib_title):
+    """Walks a library's download folder once and returns every file path in it.
+
+    Lets bulk status checks test membership in memory instead of issuing one
+    stat() per item and season. The result is cached until the library
+    folder's mtime changes, the app writes into it, or the TTL runs out.
+    """
+    lib_dir = os.path.join(base_dir, sanitize_filename(lib_title))
+    try: mtime = os.stat(lib_dir).st_mtime_ns
+    except OSError: return frozenset()  # Nothing downloaded yet
+    hit = _poster_index_cache.get(lib_dir)
+    if hit and hit[0] == mtime and time.time() - hit[1] < _POSTER_INDEX_TTL: return hit[2]
+
+    existing = set()
+    pending = [lib_dir]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False): pending.append(entry.path)
+                    else: existing.add(entry.path)
+        except OSError:
+            continue
+    existing = frozenset(existing)
+    _poster_index_cache[lib_dir] = (mtime, time.time(), existing)
+    return existing
+
+def invalidate_poster_index(path=None):
+    """Drops cached indexes and disk stats containing `path`, or all of them
+    when omitted."""
+    # Per-folder scan entries check their own mtimes, so only a full reset drops them.
+    if path is None: _dir_scan_cache.clear()
+    for cache in (_poster_index_cache, _disk_stats_cache):
+        if path is None: cache.clear(); continue
+        for lib_dir in list(cache):
+            if path.startswith(lib_dir + os.sep): cache.pop(lib_dir, None)
+
+def check_file_exists(item, lib_title=None, img_type='poster', ctx=None, existing=None):
+    target_path = get_target_file_path(item, lib_title, img_type=img_type, ctx=ctx)
     if target_path:
+        if existing is not None: return target_path in existing
         return os.path.exists(target_path)
     return False
 
-def safe_html(value):
-    """Escape a value for safe interpolation into HTML strings rendered via
-    render_template_string.  Prevents both XSS (HTML special chars) and SSTI
-    (Jinja2 delimiter injection) by escaping HTML entities and then replacing
-    any remaining { / } characters so Jinja2 never sees them as template tags.
-    Returns a Markup object so the value won't be double-escaped if Jinja2
-    also processes the surrounding template.
-    """
-    text = str(escape(value))                        # HTML-escape < > & " '
-    text = text.replace('{', '&#123;').replace('}', '&#125;')  # kill {{ }}
-    return Markup(text)  # nosemgrep: explicit-unescape-with-markup
-
-
 # Whitelist of routes that safe_referrer_redirect() is allowed to return to.
 # Each entry is (compiled regex, flask endpoint name, url_for kwarg name or None).
 # The redirect URL is always built with url_for() so no user-supplied bytes
@@ -326,7 +625,7 @@ def validate_image_url(url):
 
         # Always allow the configured Plex server host so poster downloads work
         # even when Plex lives on localhost or a private network address.
-        cfg = get_config()
+        cfg = get_config(copy=False)
         plex_url = cfg.get('PLEX_URL', '')
         plex_host = urlparse(plex_url).hostname if plex_url else None
         if plex_host:
@@ -345,91 +644,391 @@ def validate_image_url(url):
     except Exception:
         return False
 
+# Images up to this size (per Content-Length) are buffered and written at once.
+_SMALL_IMAGE = 4 * 1024 * 1024
+
+def open_for_write(path):
+    """open(path, 'wb'), creating the parent folder only if it is missing.
+    Folders almost always exist already, so this skips a makedirs() per file."""
+    try:
+        return open(path, 'wb')
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return open(path, 'wb')
+
+def read_body(r):
+    """The whole body of a stream=True response in one read. r.content would
+    assemble it from 10 KB iter_content() chunks in a Python loop."""
+    r.raw.decode_content = True
+    return r.raw.read()
+
+def download_image(url, save_path):
+    """Streams an image to save_path. Returns True if it was saved."""
+    with http_session.get(url, stream=True, timeout=HTTP_TIMEOUT) as r:
+        if r.status_code != 200: return False
+        try: size = int(r.headers.get('Content-Length', ''))
+        except ValueError: size = None
+        # Write beside the target and swap it in, so an interrupted download
+        # never leaves a truncated poster that looks complete.
+        tmp = f"{save_path}.{threading.get_ident()}.part"
+        try:
+            with open_for_write(tmp) as f:
+                if size is not None and size <= _SMALL_IMAGE:
+                    # Typical posters: read whole, written in one call.
+                    f.write(read_body(r))
+                else:
+                    # Copy straight from the socket in 1 MiB reads instead of
+                    # a Python loop over small iter_content() chunks.
+                    r.raw.decode_content = True
+                    shutil.copyfileobj(r.raw, f, length=1024 * 1024)
+            os.replace(tmp, save_path)
+        except BaseException:
+            # Only a failed download leaves the part file behind; a successful
+            # one costs no extra stat() to check for it.
+            try: os.remove(tmp)
+            except OSError: pass
+            raise
+    invalidate_poster_index(save_path)
+    return True
+
+def download_images(tasks, max_workers=8):
+    """Downloads (url, save_path) pairs concurrently.
+
+    Returns a list of booleans in the same order as `tasks`.
+    """
+    def run(task):
+        try: return download_image(*task)
+        except Exception as e:
+            log_verbose(f"Download Error for {task[1]}: {e}")
+            return False
+    if not tasks: return []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='download') as pool:
+        return list(pool.map(run, tasks))
+
 def get_poster_url(poster):
     key = getattr(poster, 'key', None)
     if not key: return ""
     if key.startswith('http') or key.startswith('https'): return key
     return plex.url(key)
 
+# Plex artwork paths look like /library/metadata/<ratingKey>/thumb/<updatedAt>.
+_THUMB_RE = re.compile(r'^/library/metadata/(\d+)/thumb/(\d+)$')
+THUMB_DIR = os.path.join(DATA_DIR, 'cache', 'thumbs')
+
+def get_thumb_url(item):
+    """Returns the app's cached /thumb URL for an item's artwork, or '' if it has none."""
+    thumb = getattr(item, 'thumb', None)
+    if not thumb: return ''
+    m = _THUMB_RE.match(thumb)
+    if not m: return item.thumbUrl
+    return f"/thumb/{m.group(1)}/{m.group(2)}"
+
+def fetch_item(rating_key):
+    """plex.fetchItem() with a short-lived cache of recently opened items."""
+    rating_key = int(rating_key)
+    hit = _item_cache.get(rating_key)
+    if hit and time.monotonic() - hit[0] < _ITEM_TTL: return hit[1]
+    item = plex.fetchItem(rating_key)
+    if len(_item_cache) >= _ITEM_CACHE_MAX: _item_cache.pop(next(iter(_item_cache)), None)  # Oldest entry
+    _item_cache[rating_key] = (time.monotonic(), item)
+    return item
+
+def item_library(item):
+    """(section key, title) of an item's library, from the item itself when
+    Plex included them, so no section() request is needed."""
+    key = getattr(item, 'librarySectionID', None)
+    title = getattr(item, 'librarySectionTitle', None)
+    if key and title: return int(key), title
+    lib = item.section()
+    return lib.key, lib.title
+
+_card_attrs = attrgetter('title', 'ratingKey')
+_card_title = itemgetter('title')  # Sort key for item_card() dicts
+
+def art_cards(images):
+    """The (url, provider label, key) rows the poster and background pickers
+    render, resolved once here rather than per attribute in the template."""
+    return [(get_poster_url(p), format_provider(p.provider), getattr(p, 'key', '')) for p in images]
+
+def item_card(item):
+    """The title/ratingKey/thumbUrl dict the library grids render."""
+    title, rating_key = _card_attrs(item)
+    return {'title': title, 'ratingKey': rating_key, 'thumbUrl': get_thumb_url(item)}
+
 # ==========================================
 # 4. HISTORY MANAGEMENT
 # ==========================================
-def load_history_data():
-    cfg = get_config()
-    hist_file = cfg.get('HISTORY_FILE', 'download_history.json')
-    if not os.path.isabs(hist_file) and DATA_DIR != '.':
-         hist_file = os.path.join(DATA_DIR, os.path.basename(hist_file))
-    if not os.path.exists(hist_file): return {"downloads": {}, "overrides": []}
-    try:
-        with open(hist_file, 'r') as f:
-            data = json.load(f)
-            if "downloads" not in data: data["downloads"] = {}
-            if "overrides" not in data: data["overrides"] = []
-            return data
-    except: return {"downloads": {}, "overrides": []}
+# Parsed download_history.json, reused until the file changes on disk.
+_history_cache = {'path': None, 'stamp': None, 'data': None, 'dirty': False}
+_history_lock = threading.RLock()
+
+def get_history_file():
+    cfg = get_config(copy=False)
+    return resolve_data_path(cfg.get('HISTORY_FILE', 'download_history.json'), basename_only=True)
+
+def empty_history():
+    return {"downloads": {}, "overrides": [], "_overrides_set": set(), "_rating_keys": frozenset()}
+
+def index_history(data):
+    """Fills in missing sections and the derived "_" lookups of a history dict."""
+    if "downloads" not in data: data["downloads"] = {}
+    if "overrides" not in data: data["overrides"] = []
+    data["_overrides_set"] = set(data["overrides"])
+    keys = set(data["downloads"]); keys.update(data["overrides"])
+    data["_rating_keys"] = frozenset(map(int, filter(str.isdigit, keys)))
+    return data
+
+def load_history_data(copy=True):
+    """Returns the download history.
+
+    Read-only callers pass copy=False to get the cached dict itself instead of
+    a copy they are free to edit.
+
+    "overrides" is kept as a list for the JSON file; "_overrides_set" mirrors
+    it for O(1) membership tests and is never written to disk. "_rating_keys"
+    holds every downloaded or overridden rating key as an int.
+    """
+    hist_file = get_history_file()
+    # With deferred downloads not yet flushed the cached copy is newest, even
+    # before the file exists on a fresh install.
+    if not (_history_cache['dirty'] and hist_file == _history_cache['path']):
+        stamp = file_stamp(hist_file)
+        if stamp is None: return empty_history()
+        if hist_file != _history_cache['path'] or stamp != _history_cache['stamp']:
+            try:
+                data = index_history(read_json(hist_file))
+            except: return empty_history()
+            _history_cache.update(path=hist_file, stamp=stamp, data=data)
+    data = _history_cache['data']
+    if not copy: return data
+    # Copy the containers so callers can edit them before save_history_data().
+    return dict(data, downloads=dict(data["downloads"]), overrides=list(data["overrides"]),
+                _overrides_set=set(data["_overrides_set"]))
 
 def save_history_data(data):
-    cfg = get_config()
-    hist_file = cfg.get('HISTORY_FILE', 'download_history.json')
-    if not os.path.isabs(hist_file) and DATA_DIR != '.':
-         hist_file = os.path.join(DATA_DIR, os.path.basename(hist_file))
-    with open(hist_file, 'w') as f: json.dump(data, f, indent=2)
-
-def save_download_history(rating_key, img_url, img_type='poster'):
-    data = load_history_data()
-    key = str(rating_key) if img_type == 'poster' else f"{rating_key}_bg"
-    data["downloads"][key] = img_url
-    save_history_data(data)
-
-def get_history_url(rating_key, img_type='poster'):
-    data = load_history_data()
+    hist_file = get_history_file()
+    to_save = {k: v for k, v in data.items() if not k.startswith('_')}
+    with _history_lock:
+        write_json(hist_file, to_save)
+        # Write through, so the next load doesn't re-read the file. The caller
+        # keeps its own dict, hence the copies.
+        cached = index_history(dict(to_save, downloads=dict(to_save["downloads"]), overrides=list(to_save["overrides"])))
+        _history_cache.update(path=hist_file, stamp=file_stamp(hist_file), data=cached, dirty=False)
+
+def save_download_history(rating_key, img_url, img_type='poster', defer=False):
+    """Records a download. With defer=True the entry is held in memory until
+    flush_history() runs, so bulk downloads rewrite the file once."""
+    with _history_lock:
+        data = load_history_data()
+        key = str(rating_key) if img_type == 'poster' else f"{rating_key}_bg"
+        data["downloads"][key] = img_url
+        if img_type == 'poster' and key.isdigit():
+            data["_rating_keys"] = data["_rating_keys"] | {int(key)}
+        if defer: _history_cache.update(path=get_history_file(), data=data, dirty=True)
+        else: save_history_data(data)
+
+def flush_history():
+    with _history_lock:
+        if _history_cache['dirty']: save_history_data(_history_cache['data'])
+
+def get_history_url(rating_key, img_type='poster', history=None):
+    data = history if history is not None else load_history_data(copy=False)
     key = str(rating_key) if img_type == 'poster' else f"{rating_key}_bg"
     return data["downloads"].get(key)
 
 def toggle_override_status(rating_key):
-    data = load_history_data()
-    rk_str = str(rating_key)
-    if rk_str in data["overrides"]:
-        data["overrides"].remove(rk_str)
-        status = False
-    else:
-        data["overrides"].append(rk_str)
-        status = True
-    save_history_data(data)
+    with _history_lock:
+        data = load_history_data()
+        rk_str = str(rating_key)
+        if rk_str in data["_overrides_set"]:
+            data["overrides"].remove(rk_str)
+            data["_overrides_set"].discard(rk_str)
+            status = False
+        else:
+            data["overrides"].append(rk_str)
+            data["_overrides_set"].add(rk_str)
+            status = True
+        save_history_data(data)
     return status
 
-def is_overridden(rating_key):
-    data = load_history_data()
-    return str(rating_key) in data["overrides"]
+def is_overridden(rating_key, history=None):
+    data = history if history is not None else load_history_data(copy=False)
+    return str(rating_key) in data["_overrides_set"]
+
+def prefetch_seasons(items):
+    """Fetches the seasons of every show in `items` concurrently.
+
+    PlexAPI is synchronous, so listing N shows one by one costs N round-trips
+    back to back; the shared pool overlaps them. Returns {ratingKey: seasons}.
+    """
+    shows = list({i.ratingKey: i for i in items if i.type == 'show'}.values())
+    if not shows: return {}
+    return dict(zip((s.ratingKey for s in shows), plex_pool.map(lambda s: s.seasons(), shows)))
+
+def _cached_status(item, lib_title, ctx, existing):
+    entry = _status_cache.get(lib_title)
+    if not entry or entry[0] is not existing: return None
+    hit = entry[1].get(item.ratingKey)
+    if hit and hit[0] == (ctx, getattr(item, 'childCount', None)): return hit[1]
+    return None
 
-def get_item_status(item, lib_title):
-    if is_overridden(item.ratingKey): return 'complete'
+def _store_status(item, lib_title, ctx, existing, status):
+    entry = _status_cache.get(lib_title)
+    # A new poster index starts the library's dict over, so statuses built
+    # from older indexes (and the indexes themselves) are not kept alive.
+    if not entry or entry[0] is not existing:
+        entry = _status_cache[lib_title] = (existing, {})
+    entry[1][item.ratingKey] = ((ctx, getattr(item, 'childCount', None)), status)
+
+def get_item_status(item, lib_title, history=None, ctx=None, existing=None, seasons=None):
+    """Classifies an item as complete/partial/missing.
+
+    Pass in an already loaded `history`, path `ctx` and `existing` poster index
+    (see build_existing_poster_index) when checking many items so they are
+    not rebuilt for every item and season. `seasons` skips the per-show
+    seasons() request when they were fetched up front (see prefetch_seasons).
+    """
+    if history is None: history = load_history_data(copy=False)
+    if ctx is None: ctx = path_context()
+    if is_overridden(item.ratingKey, history): return 'complete'
+    if existing is not None:
+        status = _cached_status(item, lib_title, ctx, existing)
+        if status is None:
+            status = _item_file_status(item, lib_title, ctx, existing, seasons)
+            _store_status(item, lib_title, ctx, existing, status)
+        return status
+    return _item_file_status(item, lib_title, ctx, existing, seasons)
+
+def _item_file_status(item, lib_title, ctx, existing=None, seasons=None):
     if item.type == 'movie':
-        return 'complete' if check_file_exists(item, lib_title) else 'missing'
+        return 'complete' if check_file_exists(item, lib_title, ctx=ctx, existing=existing) else 'missing'
     if item.type == 'show':
-        has_show_poster = check_file_exists(item, lib_title)
-        seasons = item.seasons()
-        total = len(seasons)
-        downloaded = 0
-        for season in seasons:
-            if check_file_exists(season, lib_title): downloaded += 1
+        has_show_poster = check_file_exists(item, lib_title, ctx=ctx, existing=existing)
+        if seasons is None: seasons = item.seasons()
+        # Season paths only differ by index, so resolve the show folder once.
+        lib_dir = os.path.join(ctx.base_dir, sanitize_filename(lib_title))
+        show_folder = get_physical_folder_name(item)
+        expected = {season_file_path(lib_dir, show_folder, season.index, ctx.style) for season in seasons}
+        if existing is not None:
+            total, downloaded = len(expected), len(expected & existing)
+        else:
+            total, downloaded = len(seasons), sum(1 for path in expected if os.path.exists(path))
         if has_show_poster and downloaded == total: return 'complete'
         elif not has_show_poster and downloaded == 0: return 'missing'
         else: return 'partial'
     return 'missing'
 
+def get_item_statuses(items, lib_title, history=None, ctx=None):
+    """Batch form of get_item_status: returns {ratingKey: status}.
+
+    The history, path context, poster index and show seasons are each loaded once
+    for the whole batch.
+    """
+    if history is None: history = load_history_data(copy=False)
+    if ctx is None: ctx = path_context()
+    existing = build_existing_poster_index(ctx.base_dir, lib_title)
+    if not existing:
+        # No files for this library, so only manual overrides can be complete;
+        # skip resolving paths (and fetching seasons) for every item.
+        return {i.ratingKey: 'complete' if is_overridden(i.ratingKey, history) else 'missing' for i in items}
+    # A show with no poster and no file where its seasons would go is missing
+    # without listing its seasons.
+    if ctx.style == 'NO_ASSET_FOLDERS':
+        season_owners = {p[:p.rfind('_Season')] for p in existing if '_Season' in os.path.basename(p)}
+        owner = lambda path: path[:-4]
+    else:
+        season_owners = {os.path.dirname(p) for p in existing}
+        owner = os.path.dirname
+    # Done items and page items overlap; classify each ratingKey once.
+    statuses, pending = {}, []
+    for i in {i.ratingKey: i for i in items}.values():
+        if is_overridden(i.ratingKey, history):
+            statuses[i.ratingKey] = 'complete'
+            continue
+        status = _cached_status(i, lib_title, ctx, existing)
+        if status is not None:
+            statuses[i.ratingKey] = status
+            continue
+        if i.type == 'show':
+            path = get_target_file_path(i, lib_title, ctx=ctx)
+            if path not in existing and owner(path) not in season_owners:
+                statuses[i.ratingKey] = 'missing'
+                continue
+        pending.append(i)
+    seasons_map = prefetch_seasons(pending)
+    for i in pending:
+        statuses[i.ratingKey] = get_item_status(i, lib_title, history, ctx, existing, seasons_map.get(i.ratingKey))
+    return statuses
+
 # ==========================================
 # 5. STATS
 # ==========================================
 def format_size(size_bytes):
     if size_bytes == 0: return "0 B"
     size_name = ("B", "KB", "MB", "GB", "TB")
-    i = int(math.floor(math.log(size_bytes, 1024)))
-    p = math.pow(1024, i)
-    s = round(size_bytes / p, 2)
+    # Power-of-1024 bucket from the bit length; no float log/pow needed.
+    i = min((int(size_bytes).bit_length() - 1) // 10, len(size_name) - 1)
+    s = round(size_bytes / (1 << (i * 10)), 2)
     return "%s %s" % (s, size_name[i])
 
-def get_library_stats(lib):
+def _scan_folder(folder, mtime):
+    """Lists one folder for scan_library_dir(). Returns its cache entry, or None."""
+    files, subdirs = [], []
+    posters = bgs = size = 0
+    try:
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False): subdirs.append(entry.path); continue
+                files.append(entry.path)
+                name = entry.name.lower()
+                if not name.endswith(('.jpg', '.png')): continue
+                size += entry.stat().st_size
+                # Detect backgrounds
+                if 'background' in name: bgs += 1
+                else: posters += 1
+    except OSError:
+        return None
+    return (mtime, tuple(files), tuple(subdirs), (posters, bgs, size))
+
+def scan_library_dir(lib_dir):
+    """Returns (poster count, background count, total bytes) of the images in
+    a library folder, cached like the poster index (see build_existing_poster_index),
+    which the same walk refreshes.
+    """
+    try: mtime = os.stat(lib_dir).st_mtime_ns
+    except OSError: return (0, 0, 0)
+    hit = _disk_stats_cache.get(lib_dir)
+    if hit and hit[0] == mtime and time.time() - hit[1] < _POSTER_INDEX_TTL: return hit[2]
+
+    file_count = bg_count = total_size = 0
+    paths = set()
+    old_dirs = _dir_scan_cache.get(lib_dir, {})
+    dirs = {}
+    trust_before = time.time_ns() - _MTIME_SLACK_NS
+    pending = [lib_dir]
+    while pending:
+        folder = pending.pop()
+        try: folder_mtime = mtime if folder == lib_dir else os.stat(folder).st_mtime_ns
+        except OSError: continue
+        hit = old_dirs.get(folder)
+        if hit is None or hit[0] != folder_mtime or folder_mtime >= trust_before:
+            hit = _scan_folder(folder, folder_mtime)
+            if hit is None: continue
+        dirs[folder] = hit
+        paths.update(hit[1])
+        pending.extend(hit[2])
+        file_count += hit[3][0]
+        bg_count += hit[3][1]
+        total_size += hit[3][2]
+    _dir_scan_cache[lib_dir] = dirs
+    result = (file_count, bg_count, total_size)
+    now = time.time()
+    _disk_stats_cache[lib_dir] = (mtime, now, result)
+    # Same walk as the poster index, so prime it for the library pages too.
+    _poster_index_cache[lib_dir] = (mtime, now, frozenset(paths))
+    return result
+
+def get_library_stats(lib, base_dir=None):
     stats = {
         'type': lib.type,
         'content_str': "0 Items",
@@ -438,45 +1037,32 @@ def get_library_stats(lib):
         'disk_size': 0,
         'size_str': "0 B"
     }
-    try:
-        if lib.type == 'movie':
-            count = lib.totalSize
-            stats['content_str'] = f"{count} Movies"
-        elif lib.type == 'show':
-            show_count = lib.totalSize
-            ep_count = 0
-            try:
-                key = f'/library/sections/{lib.key}/all?type=4&X-Plex-Container-Start=0&X-Plex-Container-Size=0'
-                container = plex.query(key)
-                ep_count = int(container.attrib.get('totalSize', 0))
-            except: pass
-            stats['content_str'] = f"{show_count} Shows, {ep_count} Episodes"
-    except: pass
+    hit = _content_cache.get(lib.key)
+    if hit and time.monotonic() - hit[0] < _SECTIONS_TTL:
+        stats['content_str'] = hit[1]
+    else:
+        try:
+            if lib.type == 'movie':
+                count = lib.totalSize
+                stats['content_str'] = f"{count} Movies"
+            elif lib.type == 'show':
+                show_count = lib.totalSize
+                ep_count = 0
+                try:
+                    key = f'/library/sections/{lib.key}/all?type=4&X-Plex-Container-Start=0&X-Plex-Container-Size=0'
+                    container = plex.query(key)
+                    ep_count = int(container.attrib.get('totalSize', 0))
+                except: pass
+                stats['content_str'] = f"{show_count} Shows, {ep_count} Episodes"
+            _content_cache[lib.key] = (time.monotonic(), stats['content_str'])
+        except: pass
     
-    cfg = get_config()
-    base_dir = cfg.get('DOWNLOAD_BASE_DIR', 'downloaded_posters')
-    if not os.path.isabs(base_dir) and DATA_DIR != '.':
-        base_dir = os.path.join(DATA_DIR, base_dir)
+    if base_dir is None: base_dir = get_download_base_dir()
     
     clean_lib = sanitize_filename(lib.title)
     lib_dir = os.path.join(base_dir, clean_lib)
     
-    file_count = 0
-    bg_count = 0
-    total_size = 0
-    
-    if os.path.exists(lib_dir):
-        for root, dirs, files in os.walk(lib_dir):
-            for f in files:
-                if f.lower().endswith('.jpg') or f.lower().endswith('.png'):
-                    fp = os.path.join(root, f)
-                    total_size += os.path.getsize(fp)
-                    
-                    # Detect backgrounds
-                    if 'background' in f.lower():
-                        bg_count += 1
-                    else:
-                        file_count += 1
+    file_count, bg_count, total_size = scan_library_dir(lib_dir)
     
     stats['downloaded_count'] = file_count
     stats['bg_downloaded_count'] = bg_count
@@ -484,9 +1070,164 @@ def get_library_stats(lib):
     stats['size_str'] = format_size(total_size)
     return stats
 
+def get_all_library_stats(libs):
+    """Yields get_library_stats() for each library in order, gathered
+    concurrently since each is a Plex query plus a (possibly remote) disk walk."""
+    base_dir = get_download_base_dir()
+    return plex_pool.map(lambda lib: get_library_stats(lib, base_dir), libs)
+
+# ==========================================
+# 6. MIGRATION
+# ==========================================
+# Season stems used by the two layouts (see get_target_file_path), plus the
+# older "Season 1" spelling which is normalised to "Season01" on the way.
+_ASSET_SEASON_RE = re.compile(r'(Season\s*\d+|Specials)$', re.IGNORECASE)
+_LEGACY_SEASON_RE = re.compile(r'Season\s*(\d+)', re.IGNORECASE)
+
+def _season_label(name):
+    m = _LEGACY_SEASON_RE.fullmatch(name)
+    return f"Season{int(m.group(1)):02d}" if m else name
+
+def _flat_parse(stem):
+    """Splits a flat "<Folder>_SeasonXX" stem into (folder, season), else None."""
+    i = stem.rfind('_')
+    if i < 0: return None
+    suf = stem[i + 1:]
+    # Our own files are always "SeasonNN"/"Specials"; only odd spellings hit the regex.
+    if suf == 'Specials' or (suf.startswith('Season') and suf[6:].isascii() and suf[6:].isdigit()):
+        return stem[:i], suf
+    if suf[:1] in ('s', 'S') and _ASSET_SEASON_RE.match(suf): return stem[:i], suf
+    return None
+
+def _split_background(stem):
+    if stem.lower().endswith('_background'): return stem[:-len('_background')], '_background'
+    return stem, ''
+
+def _fast_move(src, dest):
+    # A single rename syscall within the same filesystem; shutil copies across devices.
+    try: os.replace(src, dest)
+    except OSError: shutil.move(src, dest)
+
+def _plan_library_migration(lib_dir, target_style):
+    """Works out the moves needed to convert one library folder.
+
+    Returns (moves, folders) where moves is a list of (src, dest) pairs and
+    folders are asset folders that may be left empty afterwards.
+    """
+    # One scandir pass partitions flat files from asset folders.
+    files, folders = [], []
+    with os.scandir(lib_dir) as it:
+        for e in it:
+            if e.is_dir(follow_symlinks=False): folders.append(e)
+            elif e.is_file() and e.name.lower().endswith('.jpg'): files.append(e)
+
+    moves = []
+    if target_style == 'ASSET_FOLDERS':
+        # "<Folder>[_SeasonXX][_background].jpg" -> "<Folder>/..."
+        for e in files:
+            stem, bg = _split_background(e.name[:-4])
+            parsed = _flat_parse(stem)
+            if parsed:
+                folder, name = parsed[0], f"{_season_label(parsed[1])}{bg}.jpg"
+            else:
+                folder, name = stem, ("background.jpg" if bg else "poster.jpg")
+            moves.append((e.path, os.path.join(lib_dir, folder, name)))
+        return moves, []
+
+    # "<Folder>/poster.jpg", "<Folder>/SeasonXX.jpg", ... -> "<Folder>[_SeasonXX][_background].jpg"
+    for d in folders:
+        with os.scandir(d.path) as it:
+            inner = [f for f in it if f.is_file() and f.name.lower().endswith('.jpg')]
+        for f in inner:
+            stem, bg = _split_background(f.name[:-4])
+            if stem.lower() == 'poster' and not bg: name = f"{d.name}.jpg"
+            elif stem.lower() == 'background' and not bg: name = f"{d.name}_background.jpg"
+            elif _ASSET_SEASON_RE.match(stem): name = f"{d.name}_{_season_label(stem)}{bg}.jpg"
+            else: continue
+            moves.append((f.path, os.path.join(lib_dir, name)))
+    return moves, [d.path for d in folders]
+
+def perform_migration(target_style):
+    """Moves already downloaded files into the layout of `target_style`.
+
+    Only the local download directory is scanned, so no Plex requests are
+    made. Files whose destination already exists are left in place.
+    Returns (moved_count, error_message).
+    """
+    if target_style not in ('ASSET_FOLDERS', 'NO_ASSET_FOLDERS'):
+        return 0, f"Unknown asset style '{target_style}'"
+    base_dir = get_download_base_dir()
+    if not os.path.isdir(base_dir): return 0, None
+
+    moved = 0
+    try:
+        with os.scandir(base_dir) as it:
+            libraries = [e.path for e in it if e.is_dir(follow_symlinks=False)]
+
+        for lib_dir in libraries:
+            moves, folders = _plan_library_migration(lib_dir, target_style)
+            planned = set()
+            moves = [(src, dest) for src, dest in moves
+                     if dest not in planned and not planned.add(dest) and not os.path.exists(dest)]
+
+            # Create each destination folder once rather than once per file.
+            for d in {os.path.dirname(dest) for _, dest in moves}:
+                os.makedirs(d, exist_ok=True)
+            for src, dest in moves:
+                _fast_move(src, dest)
+                moved += 1
+
+            for d in folders:
+                try: os.rmdir(d)
+                except OSError: pass  # Folder still holds other files
+    except Exception as e:
+        log_verbose(f"Migration Error: {e}")
+        return moved, str(e)
+    finally:
+        invalidate_poster_index()
+
+    log_verbose(f"Migration to {target_style} moved {moved} files.")
+    return moved, None
+
 # ==========================================
-# 6. CRON SCHEDULER (Threaded)
+# 7. CRON SCHEDULER (Threaded)
 # ==========================================
+def _cron_pick(item, lib_title, img_type, method, mode, target_provider, ctx):
+    """Chooses an image for the cron job. Returns (item, img_type, url, save_path) or None."""
+    try: candidates = getattr(item, method)()
+    except: return None
+    if not candidates: return None
+    
+    if mode not in ('RANDOM', 'SPECIFIC_PROVIDER', 'RANDOM_PROVIDER'): return None
+    # One pass: first match for SPECIFIC_PROVIDER, otherwise a reservoir
+    # sample (uniform, like random.choice) over the eligible images.
+    selected_img = None
+    n = 0
+    for p in candidates:
+        if not p.provider: continue
+        if mode != 'RANDOM' and target_provider not in provider_key(p.provider): continue
+        if mode == 'SPECIFIC_PROVIDER':
+            selected_img = p
+            break
+        n += 1
+        if random.randrange(n) == 0: selected_img = p
+    if not selected_img: return None
+
+    try:
+        save_path = get_target_file_path(item, lib_title, img_type=img_type, ctx=ctx)
+        if not save_path: return None
+        key = selected_img.key
+        url = key if key.startswith('http') else plex.url(key)
+
+        if not validate_image_url(url):
+            log_verbose(f"Cron: Skipping {item.title} — URL failed SSRF validation: {url}")
+            return None
+        log_verbose(f"Cron: Downloading {img_type} for {item.title} (Provider: {selected_img.provider})")
+        return (item, img_type, url, save_path)
+    except Exception as e:
+        log_verbose(f"Cron Error saving {item.title}: {e}")
+        return None
+
 def run_cron_job():
     if not plex: return
     cfg = get_config()
@@ -495,13 +1236,18 @@ def run_cron_job():
     mode = cfg.get('CRON_MODE', 'RANDOM')
     target_provider = cfg.get('CRON_PROVIDER', '').lower()
     dl_bgs = cfg.get('CRON_DOWNLOAD_BACKGROUNDS', False)
-    cron_libs = cfg.get('CRON_LIBRARIES', [])
-    ignored = cfg.get('IGNORED_LIBRARIES', [])
+    cron_libs = set(cfg.get('CRON_LIBRARIES') or ())
+    ignored = set(cfg.get('IGNORED_LIBRARIES') or ())
+    ctx = path_context(cfg)
+    cron_pool = None
     
     try:
         libraries = plex.library.sections()
         processed = 0
         skipped = 0
+        tasks = [('poster', 'posters')]
+        if dl_bgs: tasks.append(('background', 'arts'))
+        cron_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='cron')
         
         for lib in libraries:
             if cron_libs and lib.title not in cron_libs: continue
@@ -510,103 +1256,130 @@ def run_cron_job():
             
             log_verbose(f"Cron: Processing Library '{lib.title}'...")
             items = lib.all()
+            existing = build_existing_poster_index(ctx.base_dir, lib.title)
             
-            for item in items:
-                tasks = [('poster', 'posters')]
-                if dl_bgs: tasks.append(('background', 'arts'))
-                
+            # Each item costs a posters()/arts() request; look them up side by side.
+            def plan(item):
+                jobs, skipped = [], 0
                 for img_type, method in tasks:
-                    if check_file_exists(item, lib.title, img_type):
+                    if check_file_exists(item, lib.title, img_type, ctx=ctx, existing=existing):
                         skipped += 1
                         continue
-                    
-                    try: candidates = getattr(item, method)()
-                    except: continue
-                    if not candidates: continue
-                    
-                    selected_img = None
-                    valid = [p for p in candidates if p.provider]
-                    if not valid: continue
-
-                    if mode == 'RANDOM':
-                        selected_img = random.choice(valid)
-                    elif mode in ['SPECIFIC_PROVIDER', 'RANDOM_PROVIDER']:
-                        matching = [p for p in valid if target_provider in str(p.provider).lower()]
-                        if matching:
-                            if mode == 'SPECIFIC_PROVIDER': selected_img = matching[0]
-                            else: selected_img = random.choice(matching)
-                    
-                    if selected_img:
-                        try:
-                            lib_title = item.section().title
-                            save_path = get_target_file_path(item, lib_title, img_type=img_type)
-                            if save_path:
-                                os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                                key = selected_img.key
-                                url = key if key.startswith('http') else plex.url(key)
-
-                                if not validate_image_url(url):
-                                    log_verbose(f"Cron: Skipping {item.title} — URL failed SSRF validation: {url}")
-                                    continue
-                                log_verbose(f"Cron: Downloading {img_type} for {item.title} (Provider: {selected_img.provider})")
-                                r = requests.get(url, stream=True)
-                                if r.status_code == 200:
-                                    with open(save_path, 'wb') as f:
-                                        for chunk in r.iter_content(1024): f.write(chunk)
-                                    save_download_history(item.ratingKey, url, img_type)
-                                    processed += 1
-                        except Exception as e:
-                            log_verbose(f"Cron Error saving {item.title}: {e}")
+                    job = _cron_pick(item, lib.title, img_type, method, mode, target_provider, ctx)
+                    if job: jobs.append(job)
+                return jobs, skipped
+            
+            jobs = []
+            for item_jobs, item_skipped in cron_pool.map(plan, items):
+                jobs.extend(item_jobs)
+                skipped += item_skipped
+
+            # Fetch the library's images concurrently, then record them in one flush.
+            results = download_images([(url, path) for _, _, url, path in jobs])
+            for (item, img_type, url, _), ok in zip(jobs, results):
+                if ok:
+                    save_download_history(item.ratingKey, url, img_type, defer=True)
+                    processed += 1
+            flush_history()
         log_verbose(f"Cron Finished. Downloaded: {processed}, Skipped: {skipped}")
     except Exception as e:
         log_verbose(f"Cron Job Failed: {e}")
+    finally:
+        if cron_pool: cron_pool.shutdown(wait=False)
+        flush_history()
+
+def cron_now(cfg):
+    """The current time in the configured cron timezone."""
+    target_tz = cfg.get('CRON_TZ', 'Local')
+    try:
+        if target_tz and target_tz != 'Local' and ZoneInfo:
+            return datetime.datetime.now(ZoneInfo(target_tz))
+    except Exception:
+        pass  # Fallback to local if TZ is invalid
+    return datetime.datetime.now()
+
+def next_cron_run(cfg, now, last_run_date=None):
+    """Start of the next scheduled minute that is still open (it may already
+    have begun), skipping the day of the last run. None if CRON_TIME is invalid."""
+    target_day = cfg.get('CRON_DAY', 'DAILY')
+    try:
+        hour, minute = (int(x) for x in cfg.get('CRON_TIME', '03:00').split(':'))
+        first = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    except ValueError:
+        return None
+    for days in range(8):
+        candidate = first + timedelta(days=days)
+        if candidate + timedelta(minutes=1) <= now or candidate.date() == last_run_date: continue
+        if target_day == 'DAILY' or target_day == candidate.strftime("%A").upper(): return candidate
+    return None
 
 def scheduler_loop():
+    """Sleeps until the next scheduled run instead of polling the clock.
+
+    save_config() sets _cron_wakeup so schedule changes apply immediately; the
+    wait is capped so clock/DST changes and outside config edits are noticed.
+    """
     last_run_date = None
     while True:
-        cfg = get_config()
+        cfg = get_config(copy=False)
+        wait = _CRON_MAX_SLEEP
         if cfg.get('CRON_ENABLED'):
-            target_time = cfg.get('CRON_TIME', '03:00')
-            target_day = cfg.get('CRON_DAY', 'DAILY')
-            target_tz = cfg.get('CRON_TZ', 'Local')
-            
-            # Determine "Now" based on Timezone
-            try:
-                if target_tz and target_tz != 'Local' and ZoneInfo:
-                    now = datetime.datetime.now(ZoneInfo(target_tz))
-                else:
-                    now = datetime.datetime.now()
-            except Exception:
-                # Fallback to local if TZ is invalid
-                now = datetime.datetime.now()
-
-            current_time = now.strftime("%H:%M")
-            current_day_name = now.strftime("%A").upper()
-            current_date = now.date()
-            
-            day_match = (target_day == 'DAILY') or (target_day == current_day_name)
-            
-            if day_match and current_time == target_time and last_run_date != current_date:
+            now = cron_now(cfg)
+            nxt = next_cron_run(cfg, now, last_run_date)
+            if nxt is not None and nxt <= now:
                 run_cron_job()
-                last_run_date = current_date
-                time.sleep(60)
-        time.sleep(30)
+                last_run_date = nxt.date()
+                continue
+            if nxt is not None: wait = min(wait, max(1, (nxt - now).total_seconds()))
+        _cron_wakeup.wait(wait)
+        _cron_wakeup.clear()
 
 cron_thread = threading.Thread(target=scheduler_loop, daemon=True)
 cron_thread.start()
 
 # ==========================================
-# 7. TEMPLATES & ROUTES
+# 8. TEMPLATES & ROUTES
 # ==========================================
+# argon2id tuned to roughly 50ms per hash, against ~200ms+ for pbkdf2 at 600k rounds.
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1) if PasswordHasher else None
+
+def hash_password(password):
+    if _password_hasher: return _password_hasher.hash(password)
+    return generate_password_hash(password, method='scrypt')
+
+def verify_password(stored_hash, password):
+    """Checks a password against an argon2 or Werkzeug hash."""
+    if not stored_hash: return False
+    if stored_hash.startswith('$argon2'):
+        if not _password_hasher: return False
+        try: return _password_hasher.verify(stored_hash, password)
+        except (VerificationError, InvalidHashError): return False
+    return check_password_hash(stored_hash, password)
+
+def password_needs_rehash(stored_hash):
+    """True if a verified hash should be replaced by hash_password()'s current
+    (cheaper to verify) format, e.g. old pbkdf2 hashes."""
+    if _password_hasher:
+        if not stored_hash.startswith('$argon2'): return True
+        try: return _password_hasher.check_needs_rehash(stored_hash)
+        except InvalidHashError: return True
+    return not stored_hash.startswith(('$argon2', 'scrypt:'))
+
+# Endpoints reachable without logging in.
+_ASSET_ENDPOINTS = frozenset({'static', 'asset'})
+_PUBLIC_ENDPOINTS = frozenset({'login', 'setup', 'logout', 'settings'})
 
 @app.before_request
 def require_auth():
+    # Static files first: no logging or config lookup for every asset fetch.
+    if request.endpoint in _ASSET_ENDPOINTS:
+        return
     log_verbose(f"Request: {request.method} {request.path} from {request.remote_addr}")
     # Fix: Added 'settings' to the allow list to prevent redirect loops during setup
-    if request.endpoint in ['static', 'login', 'setup', 'logout', 'settings']:
+    if request.endpoint in _PUBLIC_ENDPOINTS:
         return
 
-    cfg = get_config()
+    cfg = get_config(copy=False)
     
     if cfg.get('AUTH_DISABLED', False):
         return
@@ -617,27 +1390,311 @@ def require_auth():
     if 'user' not in session:
         return redirect(url_for('login'))
     
-    session.permanent = True
+    # Setting the flag marks the session modified; only do it once.
+    if not session.permanent:
+        session.permanent = True
+
+# Text responses worth compressing; images are already compressed.
+_COMPRESSIBLE_TYPES = frozenset({'text/html', 'text/css', 'application/javascript', 'application/json', 'image/svg+xml'})
+
+def pick_encoding():
+    """The best response encoding the client accepts: 'br', 'gzip' or None."""
+    accepted = request.headers.get('Accept-Encoding', '').lower()
+    if brotli and 'br' in accepted: return 'br'
+    if 'gzip' in accepted: return 'gzip'
+    return None
+
+def encode_body(data, encoding):
+    if encoding == 'br': return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+def compress_stream(chunks, encoding):
+    """Compresses a streamed body piece by piece, flushing after each one so
+    the browser can still render the page as it arrives."""
+    if encoding == 'br':
+        comp = brotli.Compressor(quality=5)
+        step, finish = (lambda b: comp.process(b) + comp.flush()), comp.finish
+    else:
+        comp = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+        step, finish = (lambda b: comp.compress(b) + comp.flush(zlib.Z_SYNC_FLUSH)), comp.flush
+    for chunk in chunks:
+        if chunk: yield step(chunk)
+    yield finish()
+
+# Compressed asset bodies by (name, encoding); assets never change.
+_asset_encoded = {}
+
+@app.after_request
+def compress_response(response):
+    """Compresses text responses (brotli or gzip) for clients that accept it."""
+    if (response.status_code != 200 or response.direct_passthrough
+            or response.mimetype not in _COMPRESSIBLE_TYPES or 'Content-Encoding' in response.headers):
+        return response
+    encoding = pick_encoding()
+    if not encoding: return response
+    if response.is_streamed:
+        response.response = compress_stream(response.iter_encoded(), encoding)
+        response.headers.pop('Content-Length', None)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+    data = response.get_data()
+    if len(data) < 512: return response
+    if request.endpoint == 'asset':
+        key = (request.view_args['name'], encoding)
+        if key not in _asset_encoded: _asset_encoded[key] = encode_body(data, encoding)
+        response.set_data(_asset_encoded[key])
+    else:
+        response.set_data(encode_body(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+# Registered after compress_response, so Flask runs it first and the tag is
+# taken from the uncompressed body (weak, as it covers both encodings).
+@app.after_request
+def add_conditional_etag(response):
+    """Lets browsers revalidate pages and get a 304 when nothing changed."""
+    if (request.method != 'GET' or response.status_code != 200 or response.is_streamed
+            or response.direct_passthrough or response.mimetype not in ('text/html', 'application/json')):
+        return response
+    if 'ETag' not in response.headers: response.add_etag(weak=True)
+    if response.mimetype == 'text/html': response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def page_etag(*parts):
+    """Weak ETag built from the inputs a page is rendered from, so a matching
+    If-None-Match can be answered before doing the work. Returns None (no
+    shortcut) while flash messages are pending or history writes are deferred.
+    """
+    if '_flashes' in session or _history_cache['dirty']: return None
+    key = repr((CSS_URL, JS_URL, _cfg_cache['stamp'], file_stamp(get_history_file())) + parts)
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+def not_modified(etag):
+    """A 304 for `etag` if the browser already has it, else None."""
+    if etag and request.if_none_match.contains_weak(etag):
+        resp = app.response_class(status=304)
+        resp.set_etag(etag, weak=True)
+        resp.cache_control.no_cache = True
+        return resp
+    return None
+
+# Rendered 404 pages by (server name, auth disabled), the only context that
+# varies between them once no flash messages are pending.
+_not_found_cache = {}
 
 @app.errorhandler(404)
 def page_not_found(e):
-    # nosemgrep: render-template-string
-    return render_template_string(HTML_TOP + """
-        <div style="text-align:center; padding: 50px;">
-            <h1>404</h1>
-            <p>Page not found. <a href="/">Go Home</a></p>
-        </div>
-    """ + HTML_BOTTOM, title="404 Not Found", breadcrumbs=[]), 404
+    if '_flashes' in session:
+        return render_template('404.html', title="404 Not Found", breadcrumbs=[]), 404
+    key = (plex.friendlyName if plex else None, bool(get_config(copy=False).get('AUTH_DISABLED', False)))
+    html = _not_found_cache.get(key)
+    if html is None:
+        html = _not_found_cache[key] = render_template('404.html', title="404 Not Found", breadcrumbs=[])
+    return html, 404
+
+_STREAM_BUFFER = 4096
+
+def render_streamed(template_name, **context):
+    """Streams a template so the head and nav reach the browser while the
+    rest of the page is still rendering.
+
+    Context processors (and so the session-backed flash messages) run before
+    the first chunk is sent, while the session can still be saved. Jinja
+    yields one piece per template node, many of them a few bytes long, so
+    they are joined into chunks of at least _STREAM_BUFFER characters before
+    each write (and compression flush).
+    """
+    return _coalesce(stream_template(template_name, **context), _STREAM_BUFFER)
+
+def _coalesce(pieces, size):
+    buf, n = [], 0
+    for piece in pieces:
+        buf.append(piece)
+        n += len(piece)
+        if n >= size:
+            yield ''.join(buf)
+            buf, n = [], 0
+    if buf: yield ''.join(buf)
+
+@app.route('/assets/<name>')
+def asset(name):
+    entry = ASSETS.get(name)
+    if not entry: return "Not Found", 404
+    resp = app.response_class(entry[0], mimetype=entry[1])
+    resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return resp
+
+def _tee_thumb(resp, path):
+    """Streams a Plex image to the client while saving it to the thumb cache."""
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            for chunk in resp.iter_content(64 * 1024):
+                f.write(chunk)
+                yield chunk
+        os.replace(tmp, path)
+    finally:
+        resp.close()
+        if os.path.exists(tmp): os.remove(tmp)
+
+# Artwork is served behind login and fetched with the server's token, so only
+# the browser may keep it, never a shared cache or proxy.
+_THUMB_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+# Image types kept in the thumb cache, by Content-Type; the file extension
+# records the type, so a cache hit is served with what Plex sent.
+_THUMB_TYPES = {'image/jpeg': '.jpg', 'image/png': '.png', 'image/webp': '.webp', 'image/gif': '.gif', 'image/avif': '.avif'}
+_THUMB_EXT_TYPES = {ext: mimetype for mimetype, ext in _THUMB_TYPES.items()}
+
+# The thumb cache is trimmed back under this size, least recently served first.
+# A hit touches the file's mtime, so that is the last-used time.
+_THUMB_CACHE_MAX_BYTES = 512 * 1024 * 1024
+_THUMB_PRUNE_INTERVAL = 600
+_thumb_prune = {'at': 0.0}
+_thumb_prune_lock = threading.Lock()
+
+def prune_thumb_cache():
+    """Removes the least recently used thumbnails until the cache fits in 90% of its cap."""
+    files, total = [], 0
+    try: entries = list(os.scandir(THUMB_DIR))
+    except FileNotFoundError: return
+    for entry in entries:
+        try:
+            if entry.is_file():
+                # Left over from the old flat <ratingKey>_<version>.<ext> layout.
+                os.remove(entry.path)
+                continue
+            for f in os.scandir(entry.path):
+                if not f.name.endswith(tuple(_THUMB_EXT_TYPES)): continue
+                st = f.stat()
+                files.append((st.st_mtime, st.st_size, f.path))
+                total += st.st_size
+        except (FileNotFoundError, NotADirectoryError): continue
+    if total <= _THUMB_CACHE_MAX_BYTES: return
+    files.sort()
+    for _, size, path in files:
+        if total <= _THUMB_CACHE_MAX_BYTES * 0.9: break
+        try: os.remove(path)
+        except FileNotFoundError: pass
+        total -= size
+
+def _schedule_thumb_prune():
+    with _thumb_prune_lock:
+        now = time.monotonic()
+        if now - _thumb_prune['at'] < _THUMB_PRUNE_INTERVAL: return
+        _thumb_prune['at'] = now
+    threading.Thread(target=prune_thumb_cache, daemon=True, name='thumb-prune').start()
+
+@app.route('/thumb/<int:rating_key>/<int:version>')
+def thumb(rating_key, version):
+    # The updatedAt version is part of the URL and file name, so neither a
+    # cached file nor the browser's copy ever goes stale.
+    etag = f"{rating_key}-{version}"
+    if request.if_none_match.contains_weak(etag):
+        out = app.response_class(status=304)
+        out.set_etag(etag)
+        out.headers['Cache-Control'] = _THUMB_CACHE_CONTROL
+        return out
+    # One folder per item, one file per version: THUMB_DIR/<ratingKey>/<version>.<ext>
+    folder = os.path.join(THUMB_DIR, str(rating_key))
+    base = os.path.join(folder, str(version))
+    for ext, cached_type in _THUMB_EXT_TYPES.items():
+        if not os.path.exists(base + ext): continue
+        # A prune may remove the file in between; it is then fetched again.
+        try:
+            os.utime(base + ext)
+            out = send_file(base + ext, mimetype=cached_type, etag=etag)
+        except FileNotFoundError: break
+        out.headers['Cache-Control'] = _THUMB_CACHE_CONTROL
+        return out
+    if not plex: return "Not Found", 404
+    try:
+        resp = http_session.get(plex.url(f"/library/metadata/{rating_key}/thumb/{version}", includeToken=True), stream=True, timeout=HTTP_TIMEOUT)
+        resp.raise_for_status()
+    except Exception as e:
+        log_verbose(f"Thumb fetch failed for {rating_key}: {e}")
+        return "Not Found", 404
+    # Older versions of this item's artwork are no longer linked anywhere. Another
+    # request may be clearing the same folder, so files already gone are fine.
+    os.makedirs(folder, exist_ok=True)
+    for old in os.listdir(folder):
+        if old.startswith(f"{version}.") or not old.endswith(tuple(_THUMB_EXT_TYPES)): continue
+        try: os.remove(os.path.join(folder, old))
+        except FileNotFoundError: pass
+    _schedule_thumb_prune()
+    mimetype = resp.headers.get('Content-Type', 'image/jpeg')
+    ext = _THUMB_TYPES.get(mimetype.split(';')[0].strip().lower())
+    # Types the cache can't label are passed through without being stored.
+    path = base + ext if ext else None
+    try: size = int(resp.headers.get('Content-Length', ''))
+    except ValueError: size = None
+    if size is not None and size <= _SMALL_IMAGE:
+        # Thumbnails are small: one read and one write, then send the same bytes.
+        with resp: data = read_body(resp)
+        if path:
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp, 'wb') as f: f.write(data)
+                os.replace(tmp, path)
+            except OSError as e:
+                log_verbose(f"Thumb cache write failed for {rating_key}: {e}")
+                if os.path.exists(tmp): os.remove(tmp)
+        out = app.response_class(data, mimetype=mimetype)
+    elif path:
+        out = app.response_class(_tee_thumb(resp, path), mimetype=mimetype)
+    else:
+        out = app.response_class(resp.iter_content(64 * 1024), mimetype=mimetype)
+        out.call_on_close(resp.close)
+    out.set_etag(etag)
+    out.headers['Cache-Control'] = _THUMB_CACHE_CONTROL
+    return out
+
+@app.template_global()
+@functools.lru_cache(maxsize=256)
+def page_options(total, current):
+    """The pager's <option> list; cached since it only depends on its two ints."""
+    return Markup(''.join(f'<option value="{p}"{" selected" if p == current else ""}>{p}</option>' for p in range(1, total + 1)))
+
+# (value, label) pairs of the settings page selects, by select.
+_SELECT_CHOICES = {
+    'asset_style': (('ASSET_FOLDERS', 'Asset Folders (Kometa Default)'), ('NO_ASSET_FOLDERS', 'No Asset Folders (Flat)')),
+    'cron_day': (('DAILY', 'Every Day'), ('MONDAY', 'Monday'), ('TUESDAY', 'Tuesday'), ('WEDNESDAY', 'Wednesday'),
+                 ('THURSDAY', 'Thursday'), ('FRIDAY', 'Friday'), ('SATURDAY', 'Saturday'), ('SUNDAY', 'Sunday')),
+    'hour': tuple((f'{h:02d}', str(h)) for h in range(1, 13)),
+    'minute': tuple((f'{m:02d}', f'{m:02d}') for m in range(60)),
+    'ampm': (('AM', 'AM'), ('PM', 'PM')),
+    'cron_mode': (('RANDOM', 'Random (No Uploads)'), ('SPECIFIC_PROVIDER', 'First from Provider'), ('RANDOM_PROVIDER', 'Random from Provider')),
+    'cron_provider': (('tmdb', 'TMDB'), ('tvdb', 'TVDB'), ('fanart', 'Fanart.tv'), ('gracenote', 'Gracenote'),
+                      ('movieposterdb', 'MoviePosterDB'), ('local', 'Local')),
+}
+
+@app.template_global()
+@functools.lru_cache(maxsize=256)
+def select_options(name, current):
+    """The <option> list of a settings select with `current` selected; built once per value."""
+    return Markup(''.join(f'<option value="{v}"{" selected" if v == current else ""}>{label}</option>' for v, label in _SELECT_CHOICES[name]))
+
+@app.template_global()
+def breadcrumbs_html(breadcrumbs):
+    """Renders the nav trail of (name, link) pairs in one escaped join."""
+    if not breadcrumbs: return ''
+    return Markup(''.join(f' &gt; <a href="{escape(link)}">{escape(name)}</a>' for name, link in breadcrumbs))  # nosemgrep: explicit-unescape-with-markup
+
+# Pages that hide the nav search box.
+_NO_SEARCH_ENDPOINTS = frozenset({'login', 'settings', 'setup'})
 
 @app.context_processor
 def inject_global_vars():
     server_name = plex.friendlyName if plex else "Disconnected"
-    cfg = get_config()
-    return dict(server_name=server_name, auth_disabled=cfg.get('AUTH_DISABLED', False), format_provider=format_provider)
+    cfg = get_config(copy=False)
+    return dict(server_name=server_name, auth_disabled=cfg.get('AUTH_DISABLED', False), format_provider=format_provider,
+                show_search=request.endpoint not in _NO_SEARCH_ENDPOINTS, flashes=get_flashed_messages())
 
 CSS_COMMON = """
     :root { --bg: #121212; --nav: #232323; --card: #232323; --text: #e5e5e5; --text-muted: #a0a0a0; --accent: #E5A00D; --primary: #E5A00D; --btn-text: #000000; --warning: #cc7b19; --danger: #c0392b; --input-bg: #111111; --border-color: #3a3a3a; }
-    body { font-family: 'Poppins', sans-serif; background: var(--bg); color: var(--text); margin: 0; padding: 20px; font-weight: 300; }
+    body { font-family: 'Poppins', system-ui, -apple-system, 'Segoe UI', Roboto, sans-serif; background: var(--bg); color: var(--text); margin: 0; padding: 20px; font-weight: 300; }
     h1, h2, h3 { color: var(--text); font-weight: 600; }
     a { text-decoration: none; color: inherit; transition: 0.2s; }
     input[type="checkbox"], input[type="radio"] { accent-color: var(--accent); }
@@ -666,6 +1723,10 @@ CSS_COMMON = """
     .card img { width: 100%; height: 300px; object-fit: cover; background: #000; }
     .card .title { padding: 15px; text-align: center; font-size: 1.1em; font-weight: 600; color: var(--text); line-height: 1.4; transition: color 0.2s; }
     .card:hover .title { color: var(--accent); }
+    .home-card { display: flex; flex-direction: column; align-items: center; justify-content: center; padding: 40px 20px; min-height: 200px; text-decoration: none; }
+    .home-card .home-icon { font-size: 4em; margin-bottom: 15px; text-shadow: 0 0 10px var(--accent); }
+    .home-card .title { font-size: 1.4em; font-weight: 700; text-align: center; color: var(--text); margin-bottom: 5px; }
+    .home-card .home-type { font-size: 0.85em; color: var(--text-muted); text-transform: uppercase; letter-spacing: 1.5px; font-weight: 500; }
     .home-card:hover { border: 2px solid var(--accent); }
     .home-card:hover .title { color: var(--accent) !important; }
     .poster-grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(220px, 1fr)); gap: 25px; }
@@ -708,34 +1769,99 @@ CSS_COMMON = """
     .stats-table tr:last-child td { border-bottom: none; }
     .stats-table tr:hover { background: rgba(255,255,255,0.02); }
     .stat-number { font-family: monospace; color: var(--accent); font-weight: bold; }
+    .stat-number.muted { color: var(--text-muted); }
+    .stats-table .stat-lib { font-weight: 600; color: var(--text); }
+    .not-found { text-align: center; padding: 50px; }
     .tabs { display: flex; border-bottom: 1px solid var(--border-color); margin-bottom: 20px; }
     .tab-btn { background: transparent; border: none; padding: 15px 25px; font-size: 1.1em; font-weight: 600; color: var(--text-muted); cursor: pointer; border-bottom: 3px solid transparent; }
     .tab-btn.active { color: var(--accent); border-bottom-color: var(--accent); }
     .tab-btn:hover { color: var(--text); }
     .tab-content { display: none; }
     .tab-content.active { display: block; }
+    /* Login / setup pages */
+    body.auth-page { display: flex; align-items: center; justify-content: center; height: 100vh; padding: 0; }
+    .auth-container { width: 100%; max-width: 400px; }
+    .auth-page .card { padding: 40px; transform: none !important; cursor: default !important; }
+    .auth-page .card:hover { transform: none; box-shadow: 0 4px 6px rgba(0,0,0,0.1); }
 """
 
-HTML_TOP = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{{ server_name }} - Poster Manager</title>
-    <link rel="icon" href="data:image/svg+xml,<svg xmlns=%22http://www.w3.org/2000/svg%22 viewBox=%220 0 100 100%22><text y=%22.9em%22 font-size=%2290%22>🎬</text></svg>">
-    <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;600&display=swap" rel="stylesheet">
-    <style>
-        """ + CSS_COMMON + """
-    </style>
-    <script>
+_CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE_RE = re.compile(r'\s*([{};:,])\s*')
+
+def _minify_css(css):
+    """Strips comments and redundant whitespace from a stylesheet."""
+    css = ' '.join(_CSS_COMMENT_RE.sub('', css).split())
+    return _CSS_SPACE_RE.sub(r'\1', css).replace(';}', '}').strip()
+
+# Minified once at import; the readable source above stays the one to edit.
+CSS_COMMON = _minify_css(CSS_COMMON)
+
+# In-memory static assets served by the /assets route: fingerprinted name -> (body, mimetype).
+ASSETS = {}
+
+def register_asset(name, body, mimetype):
+    """Registers an asset under a content-hashed name and returns its URL.
+
+    The hash changes whenever the content does, so responses can be cached
+    by browsers indefinitely.
+    """
+    data = body if isinstance(body, bytes) else body.encode('utf-8')
+    stem, ext = os.path.splitext(name)
+    fingerprinted = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+    ASSETS[fingerprinted] = (data, mimetype)
+    return f"/assets/{fingerprinted}"
+
+# Poppins is self-hosted when Poppins-{300,400,600}.woff2 are placed in
+# <DATA_DIR>/fonts (or a fonts folder shipped next to this script, so an image
+# can bundle them); otherwise pages fall back to the system font stack. Either
+# way no font requests go to a third party.
+FONT_DIR = os.path.join(DATA_DIR, 'fonts')
+FONT_DIRS = (FONT_DIR, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fonts'))
+FONT_URLS = {}
+for _weight in (300, 400, 600):
+    for _dir in FONT_DIRS:
+        _font_path = os.path.join(_dir, f'Poppins-{_weight}.woff2')
+        if os.path.isfile(_font_path):
+            with open(_font_path, 'rb') as f:
+                FONT_URLS[_weight] = register_asset(f'Poppins-{_weight}.woff2', f.read(), 'font/woff2')
+            break
+CSS_COMMON = ''.join(
+    f"@font-face{{font-family:'Poppins';font-style:normal;font-weight:{w};font-display:swap;src:url({u}) format('woff2')}}"
+    for w, u in FONT_URLS.items()) + CSS_COMMON
+FONT_PRELOAD = (f'<link rel="preload" href="{FONT_URLS[400]}" as="font" type="font/woff2" crossorigin>'
+                if 400 in FONT_URLS else '')
+
+CSS_URL = register_asset('app.css', CSS_COMMON, 'text/css')
+
+# Local fallback for missing thumbnails, so broken images don't each cost a
+# request to a third-party placeholder service.
+MISSING_IMG_SVG = ('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 40 60" preserveAspectRatio="xMidYMid slice">'
+                   '<rect width="40" height="60" fill="#2a2a2a"/><text x="20" y="36" font-family="sans-serif" '
+                   'font-size="18" fill="#777" text-anchor="middle">?</text></svg>')
+MISSING_IMG_URL = register_asset('missing.svg', MISSING_IMG_SVG, 'image/svg+xml')
+app.jinja_env.globals['missing_img'] = MISSING_IMG_URL
+
+# Served as a cached asset rather than inlined as a data URI in every page.
+FAVICON_SVG = ('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100">'
+               '<text y=".9em" font-size="90">🎬</text></svg>')
+FAVICON_LINK = f'<link rel="icon" href="{register_asset("favicon.svg", FAVICON_SVG, "image/svg+xml")}" type="image/svg+xml">'
+
+JS_COMMON = """
+    const MISSING_IMG = '""" + MISSING_IMG_URL + """';
     let searchTimeout;
+    let searchAbort;
     function handleSearch(query) {
         clearTimeout(searchTimeout);
         const resultsDiv = document.getElementById('search-results');
-        if (query.length < 2) { resultsDiv.style.display = 'none'; resultsDiv.innerHTML = ''; return; }
+        if (query.length < 2) {
+            if (searchAbort) searchAbort.abort();
+            resultsDiv.style.display = 'none'; resultsDiv.innerHTML = ''; return;
+        }
         searchTimeout = setTimeout(() => {
-            fetch(`/api/search?q=${encodeURIComponent(query)}`)
+            // Cancel the previous lookup so a slow response can't overwrite newer results.
+            if (searchAbort) searchAbort.abort();
+            searchAbort = new AbortController();
+            fetch(`/api/search?q=${encodeURIComponent(query)}`, { signal: searchAbort.signal })
                 .then(response => response.json())
                 .then(data => {
                     resultsDiv.innerHTML = '';
@@ -748,7 +1874,7 @@ HTML_TOP = """
                             const year = item.year ? `(${item.year})` : '';
                             const type = item.type === 'show' ? '📺' : '🎬';
                             div.innerHTML = `
-                                <img src="${item.thumb}" class="search-thumb" onerror="this.src='https://via.placeholder.com/40x60?text=?'">
+                                <img src="${item.thumb || MISSING_IMG}" class="search-thumb" onerror="this.onerror=null;this.src=MISSING_IMG">
                                 <div class="search-info">
                                     <span class="search-title">
                                         <span style="font-size: 1.5em; margin-right: 5px; vertical-align: middle; text-shadow: 0 0 3px var(--accent);">${type}</span>
@@ -760,7 +1886,7 @@ HTML_TOP = """
                             resultsDiv.appendChild(div);
                         });
                     } else { resultsDiv.style.display = 'none'; }
-                }).catch(err => console.error(err));
+                }).catch(err => { if (err.name !== 'AbortError') console.error(err); });
         }, 300);
     }
     function hideSearch() { setTimeout(() => { document.getElementById('search-results').style.display = 'none'; }, 200); }
@@ -790,19 +1916,36 @@ HTML_TOP = """
             updateCronUI();
         }
     });
-    </script>
+"""
+
+def _minify_js(js):
+    """Drops indentation, blank lines and whole-line // comments. Line breaks
+    are kept, so automatic semicolon insertion still behaves the same."""
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+JS_COMMON = _minify_js(JS_COMMON)
+JS_URL = register_asset('app.js', JS_COMMON, 'application/javascript')
+
+HTML_TOP = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{{ server_name }} - Poster Manager</title>
+    """ + FAVICON_LINK + """
+    """ + FONT_PRELOAD + """
+    <link rel="stylesheet" href=\"""" + CSS_URL + """\">
+    <script src=\"""" + JS_URL + """\" defer></script>
 </head>
 <body>
     <div class="nav">
         <div class="nav-links">
             <a href="/">Home</a>
-            {% if breadcrumbs %}
-                {% for name, link in breadcrumbs %}
-                    &gt; <a href="{{ link }}">{{ name }}</a>
-                {% endfor %}
-            {% endif %}
+            {{ breadcrumbs_html(breadcrumbs) }}
         </div>
-        {% if request.endpoint not in ['login', 'settings', 'setup'] %}
+        {% if show_search %}
         <div class="search-box">
             <input type="text" class="search-input" placeholder="Search movies & shows..." oninput="handleSearch(this.value)" onblur="hideSearch()">
             <div id="search-results" class="search-results"></div>
@@ -816,11 +1959,7 @@ HTML_TOP = """
             {% endif %}
         </div>
     </div>
-    {% with messages = get_flashed_messages() %}
-        {% if messages %}
-            {% for message in messages %}<div class="flash">{{ message }}</div>{% endfor %}
-        {% endif %}
-    {% endwith %}
+    {% for message in flashes %}<div class="flash">{{ message }}</div>{% endfor %}
     <div style="display:flex; justify-content:space-between; align-items:center;">
         <h1>{{ title }}</h1>
         {% if toggle_override %}
@@ -835,42 +1974,16 @@ HTML_TOP = """
 """
 
 HTML_BOTTOM = "</body></html>"
-HTML_LOGIN_SETUP = """<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width, initial-scale=1.0"><title>{{ title }} - Poster Manager</title><link rel="icon" href="data:image/svg+xml,<svg xmlns=%22http://www.w3.org/2000/svg%22 viewBox=%220 0 100 100%22><text y=%22.9em%22 font-size=%2290%22>🎬</text></svg>"><link href="https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;600&display=swap" rel="stylesheet"><style>""" + CSS_COMMON + """body{display:flex;align-items:center;justify-content:center;height:100vh;padding:0}.auth-container{width:100%;max-width:400px}.card{padding:40px;transform:none!important;cursor:default!important}.card:hover{transform:none;box-shadow:0 4px 6px rgba(0,0,0,0.1)}</style></head><body><div class="auth-container"><div class="card"><div style="text-align:center;margin-bottom:30px"><div style="font-size:3em">🎬</div><h2>{{ title }}</h2><p style="color:var(--text-muted)">{{ subtitle }}</p></div>{% with messages = get_flashed_messages() %}{% if messages %}{% for message in messages %}<div class="flash" style="text-align:center">{{ message }}</div>{% endfor %}{% endif %}{% endwith %}<form method="post"><div class="form-group"><label>Username</label><input type="text" name="username" required autofocus></div><div class="form-group"><label>Password</label><input type="password" name="password" required></div>{% if is_setup %}<div class="form-group"><label>Confirm Password</label><input type="password" name="confirm_password" required></div>{% endif %}<button type="submit" class="btn">{{ btn_text }}</button></form></div></div></body></html>"""
-
-@app.route('/')
-def home():
-    if not plex:
-        flash("Please configure your Plex Server connection.")
-        return redirect(url_for('settings'))
-    try:
-        libs = plex.library.sections()
-    except:
-        flash("Connection lost. Please check settings.")
-        return redirect(url_for('settings'))
+HTML_LOGIN_SETUP = """<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width, initial-scale=1.0"><title>{{ title }} - Poster Manager</title>""" + FAVICON_LINK + """""" + FONT_PRELOAD + """<link rel="stylesheet" href=\"""" + CSS_URL + """\"></head><body class="auth-page"><div class="auth-container"><div class="card"><div style="text-align:center;margin-bottom:30px"><div style="font-size:3em">🎬</div><h2>{{ title }}</h2><p style="color:var(--text-muted)">{{ subtitle }}</p></div>{{ flash_html }}<form method="post"><div class="form-group"><label>Username</label><input type="text" name="username" required autofocus></div><div class="form-group"><label>Password</label><input type="password" name="password" required></div>{% if is_setup %}<div class="form-group"><label>Confirm Password</label><input type="password" name="confirm_password" required></div>{% endif %}<button type="submit" class="btn">{{ btn_text }}</button></form></div></div></body></html>"""
 
-    cfg = get_config()
-    ignored = cfg.get('IGNORED_LIBRARIES', [])
-    visible_libs = [lib for lib in libs if lib.title not in ignored]
-    
-    lib_stats = []
-    for lib in visible_libs:
-        stats = get_library_stats(lib)
-        lib_stats.append({
-            'title': lib.title,
-            'content': stats['content_str'],
-            'posters': stats['downloaded_count'],
-            'backgrounds': stats['bg_downloaded_count'],
-            'size': stats['size_str']
-        })
-
-    content = """
+HOME_TPL = """
     <div class="home-grid">
         {% for lib in visible_libs %}
             {% set icon = '🎬' if lib.type == 'movie' else '📺' if lib.type == 'show' else '📁' %}
-            <a href="/library/{{ lib.key }}" class="card home-card" style="display: flex; flex-direction: column; align-items: center; justify-content: center; padding: 40px 20px; min-height: 200px; text-decoration: none;">
-                <div style="font-size: 4em; margin-bottom: 15px; text-shadow: 0 0 10px var(--accent);">{{ icon }}</div>
-                <div class="title" style="font-size: 1.4em; font-weight: 700; text-align: center; color: var(--text); margin-bottom: 5px;">{{ lib.title }}</div>
-                <div style="font-size: 0.85em; color: var(--text-muted); text-transform: uppercase; letter-spacing: 1.5px; font-weight: 500;">{{ lib.type.title() }}</div>
+            <a href="/library/{{ lib.key }}" class="card home-card">
+                <div class="home-icon">{{ icon }}</div>
+                <div class="title">{{ lib.title }}</div>
+                <div class="home-type">{{ lib.type.title() }}</div>
             </a>
         {% endfor %}
     </div>
@@ -881,242 +1994,45 @@ def home():
             <tbody>
                 {% for stat in lib_stats %}
                 <tr>
-                    <td style="font-weight:600; color:var(--text);">{{ stat.title }}</td>
+                    <td class="stat-lib">{{ stat.title }}</td>
                     <td class="stat-number">{{ stat.content }}</td>
-                    <td class="stat-number" style="color:var(--accent);">{{ stat.posters }}</td>
-                    <td class="stat-number" style="color:var(--text-muted);">{{ stat.backgrounds }}</td>
-                    <td class="stat-number" style="color:var(--text-muted);">{{ stat.size }}</td>
+                    <td class="stat-number">{{ stat.posters }}</td>
+                    <td class="stat-number muted">{{ stat.backgrounds }}</td>
+                    <td class="stat-number muted">{{ stat.size }}</td>
                 </tr>
                 {% endfor %}
             </tbody>
         </table>
     </div>
-    """
-    return render_template_string(HTML_TOP + content + HTML_BOTTOM, visible_libs=visible_libs, lib_stats=lib_stats, title="Select a Library", breadcrumbs=[], toggle_override=False)
-
-@app.route('/api/search')
-def api_search():
-    if not plex: return jsonify([])
-    query = request.args.get('q', '')
-    if len(query) < 2: return jsonify([])
-    try:
-        results = plex.search(query, limit=20)
-        data = []
-        for item in results:
-            if item.type not in ['movie', 'show']: continue
-            thumb = item.thumbUrl if item.thumb else ''
-            year = getattr(item, 'year', '')
-            data.append({
-                'title': item.title,
-                'year': year,
-                'ratingKey': item.ratingKey,
-                'thumb': thumb,
-                'type': item.type
-            })
-            if len(data) >= 10: break
-        return jsonify(data)
-    except: return jsonify([])
+"""
 
-@app.route('/setup', methods=['GET', 'POST'])
-def setup():
-    cfg = get_config()
-    if 'AUTH_USER' in cfg and cfg['AUTH_USER']: return redirect(url_for('login'))
-    if request.method == 'POST':
-        username = request.form['username']
-        password = request.form['password']
-        confirm = request.form['confirm_password']
-        if password != confirm: flash("Passwords do not match.")
-        elif len(password) < 4: flash("Password must be at least 4 characters.")
-        else:
-            cfg['AUTH_USER'] = username
-            cfg['AUTH_HASH'] = generate_password_hash(password)
-            cfg['AUTH_DISABLED'] = False
-            save_config(cfg)
-            flash("Account created! Please login.")
-            return redirect(url_for('login'))
-    return render_template_string(HTML_LOGIN_SETUP, title="Setup Admin", subtitle="Create your admin account to secure access.", btn_text="Create Account", is_setup=True)  # nosemgrep: render-template-string
-
-@app.route('/login', methods=['GET', 'POST'])
-def login():
-    cfg = get_config()
-    if cfg.get('AUTH_DISABLED', False): return redirect(url_for('home'))
-    if 'user' in session: return redirect(url_for('home'))
-    if request.method == 'POST':
-        username = request.form['username']
-        password = request.form['password']
-        stored_user = cfg.get('AUTH_USER')
-        stored_hash = cfg.get('AUTH_HASH')
-        if username == stored_user and check_password_hash(stored_hash, password):
-            session.permanent = True
-            session['user'] = username
-            return redirect(url_for('home'))
-        else: flash("Invalid username or password.")
-    return render_template_string(HTML_LOGIN_SETUP, title="Login", subtitle="Please sign in to continue.", btn_text="Sign In", is_setup=False)  # nosemgrep: render-template-string
-
-@app.route('/logout')
-def logout():
-    session.clear()
-    return redirect(url_for('login'))
-
-@app.route('/settings', methods=['GET', 'POST'])
-def settings():
-    cfg = get_config()
-    is_unconfigured = 'AUTH_USER' not in cfg or not cfg['AUTH_USER']
-    auth_disabled = cfg.get('AUTH_DISABLED', False)
-    all_libs = []
-    if plex:
-        try: all_libs = plex.library.sections()
-        except: pass
-    
-    if request.method == 'POST':
-        # Require authentication for all POST actions unless the system has no account yet.
-        # create_account is additionally restricted to only work when unconfigured.
-        if not is_unconfigured and not auth_disabled and 'user' not in session:
-            return redirect(url_for('login'))
-
-        action = request.form.get('action')
-        if action == 'create_account' and not is_unconfigured:
-            flash("An account already exists. Use change_password to update credentials.")
-            return redirect(url_for('settings'))
-        if action == 'update_config':
-            cfg['PLEX_URL'] = request.form.get('plex_url', '').strip()
-            # Handle Token Update: Only update if not the placeholder
-            token_input = request.form.get('plex_token', '').strip()
-            if token_input and token_input != '(Encrypted)':
-                cfg['PLEX_TOKEN'] = token_input
-            
-            cfg['DOWNLOAD_BASE_DIR'] = request.form.get('download_dir', 'downloaded_posters').strip()
-            cfg['HISTORY_FILE'] = request.form.get('history_file', 'download_history.json').strip()
-            cfg['ASSET_STYLE'] = request.form.get('asset_style', 'ASSET_FOLDERS')
-            cfg['CRON_ENABLED'] = (request.form.get('cron_enabled') == 'on')
-            
-            # Time Handling
-            day = request.form.get('cron_day', 'DAILY')
-            # 12h to 24h Conversion
-            h_12 = int(request.form.get('cron_hour', '12'))
-            m = int(request.form.get('cron_minute', '00'))
-            ampm = request.form.get('cron_ampm', 'AM')
-            
-            h_24 = h_12
-            if ampm == 'PM' and h_12 != 12:
-                h_24 += 12
-            elif ampm == 'AM' and h_12 == 12:
-                h_24 = 0
-            
-            cfg['CRON_DAY'] = day
-            cfg['CRON_TIME'] = f"{h_24:02d}:{m:02d}"
-            
-            cfg['CRON_TZ'] = request.form.get('cron_tz', 'Local').strip()
-
-            cfg['CRON_MODE'] = request.form.get('cron_mode', 'RANDOM')
-            cfg['CRON_PROVIDER'] = request.form.get('cron_provider', '').strip()
-            cfg['CRON_DOWNLOAD_BACKGROUNDS'] = (request.form.get('cron_download_backgrounds') == 'on')
-            cfg['VERBOSE_LOGGING'] = (request.form.get('cron_logging') == 'on')
-            cfg['IGNORED_LIBRARIES'] = request.form.getlist('ignored_libs')
-            cfg['CRON_LIBRARIES'] = request.form.getlist('cron_libs')
-            save_config(cfg)
-            if init_plex(): flash("Settings saved and connected!")
-            else: flash("Settings saved but connection failed.")
-            return redirect(url_for('home'))
-        elif action == 'migrate_assets':
-            target_style = request.form.get('target_style')
-            count, error = perform_migration(target_style)
-            if error: flash(f"Migration error: {error}")
-            else: flash(f"Migrated {count} files.")
-            cfg['ASSET_STYLE'] = target_style
-            save_config(cfg)
-        elif action == 'change_password':
-            current_pw = request.form.get('current_password')
-            new_pw = request.form.get('new_password')
-            confirm_pw = request.form.get('confirm_password')
-            stored_hash = cfg.get('AUTH_HASH')
-            if not stored_hash or not check_password_hash(stored_hash, current_pw): flash("Current password incorrect.")
-            elif new_pw != confirm_pw: flash("New passwords do not match.")
-            elif len(new_pw) < 4: flash("Password too short.")
-            else:
-                cfg['AUTH_HASH'] = generate_password_hash(new_pw)
-                save_config(cfg)
-                flash("Password updated.")
-        elif action == 'create_account':
-            username = request.form.get('new_username')
-            new_pw = request.form.get('new_password')
-            confirm_pw = request.form.get('confirm_password')
-            if new_pw != confirm_pw: flash("Passwords do not match.")
-            elif len(new_pw) < 4: flash("Password too short.")
-            else:
-                cfg['AUTH_USER'] = username
-                cfg['AUTH_HASH'] = generate_password_hash(new_pw)
-                cfg['AUTH_DISABLED'] = False
-                save_config(cfg)
-                session.permanent = True
-                session['user'] = username
-                flash("Account created!")
-                return redirect(url_for('home'))
-        elif action == 'disable_auth':
-            if is_unconfigured:
-                cfg['AUTH_DISABLED'] = True
-                save_config(cfg)
-                return redirect(url_for('home'))
-            else:
-                current_pw = request.form.get('current_password_disable')
-                stored_hash = cfg.get('AUTH_HASH')
-                if not stored_hash or not check_password_hash(stored_hash, current_pw): flash("Incorrect password.")
-                else:
-                    cfg['AUTH_DISABLED'] = True
-                    cfg.pop('AUTH_USER', None)
-                    cfg.pop('AUTH_HASH', None)
-                    save_config(cfg)
-                    session.clear()
-                    return redirect(url_for('home'))
-        return redirect(url_for('settings'))
-
-    # Helper for Time Selects (24h -> 12h)
-    cron_time = cfg.get('CRON_TIME', '03:00')
-    try:
-        h_24_str, m_str = cron_time.split(':')
-        h_24 = int(h_24_str)
-        c_minute = m_str
-        c_ampm = 'AM' if h_24 < 12 else 'PM'
-        c_hour_12 = h_24
-        if h_24 == 0: c_hour_12 = 12
-        elif h_24 > 12: c_hour_12 = h_24 - 12
-        c_hour = f"{c_hour_12:02d}"
-    except:
-        c_hour, c_minute, c_ampm = '03', '00', 'AM'
-
-    # Prepare config for display (mask token)
-    display_cfg = cfg.copy()
-    if display_cfg['PLEX_TOKEN']:
-        display_cfg['PLEX_TOKEN'] = '(Encrypted)'
-
-    content = """
-    <div style="max-width: 800px; margin: 0 auto;">
-        <div class="card" style="padding: 30px; cursor: default; transform: none; box-shadow: none; margin-bottom: 30px;">
-            <h2 style="margin-top:0;">Configuration</h2>
-            <form method="post">
-                <input type="hidden" name="action" value="update_config">
-                <div class="form-group"><label>Plex Server URL</label><input type="text" name="plex_url" value="{{ cfg.PLEX_URL }}" placeholder="http://localhost:32400"></div>
-                
-                <div class="form-group">
-                    <label>Plex Token (X-Plex-Token)</label>
-                    {% if cfg.PLEX_TOKEN == '(Encrypted)' %}
-                        <div id="token-view" style="display:flex; gap:10px;">
-                            <input type="text" value="(Encrypted)" disabled style="background:#2a2a2a; border:1px solid #444; color:#888;">
-                            <button type="button" class="btn" style="width:auto; margin:0; padding:10px 20px;" onclick="document.getElementById('token-view').style.display='none'; document.getElementById('token-edit').style.display='block';">Change</button>
-                        </div>
-                        <div id="token-edit" style="display:none;">
-                            <input type="text" name="plex_token" placeholder="Enter new X-Plex-Token">
-                        </div>
-                    {% else %}
-                        <input type="text" name="plex_token" value="{{ cfg.PLEX_TOKEN }}" placeholder="Your Plex Token">
-                    {% endif %}
-                </div>
+SETTINGS_TPL = """
+    <div style="max-width: 800px; margin: 0 auto;">
+        <div class="card" style="padding: 30px; cursor: default; transform: none; box-shadow: none; margin-bottom: 30px;">
+            <h2 style="margin-top:0;">Configuration</h2>
+            <form method="post">
+                <input type="hidden" name="action" value="update_config">
+                <div class="form-group"><label>Plex Server URL</label><input type="text" name="plex_url" value="{{ cfg.PLEX_URL }}" placeholder="http://localhost:32400"></div>
+                
+                <div class="form-group">
+                    <label>Plex Token (X-Plex-Token)</label>
+                    {% if cfg.PLEX_TOKEN == '(Encrypted)' %}
+                        <div id="token-view" style="display:flex; gap:10px;">
+                            <input type="text" value="(Encrypted)" disabled style="background:#2a2a2a; border:1px solid #444; color:#888;">
+                            <button type="button" class="btn" style="width:auto; margin:0; padding:10px 20px;" onclick="document.getElementById('token-view').style.display='none'; document.getElementById('token-edit').style.display='block';">Change</button>
+                        </div>
+                        <div id="token-edit" style="display:none;">
+                            <input type="text" name="plex_token" placeholder="Enter new X-Plex-Token">
+                        </div>
+                    {% else %}
+                        <input type="text" name="plex_token" value="{{ cfg.PLEX_TOKEN }}" placeholder="Your Plex Token">
+                    {% endif %}
+                </div>
 
                 <div class="form-group"><label>Download Directory</label><input type="text" name="download_dir" value="{{ cfg.DOWNLOAD_BASE_DIR }}"></div>
                 <div class="form-group"><label>Asset Folder Style</label>
                     <select name="asset_style">
-                        <option value="ASSET_FOLDERS" {% if cfg.ASSET_STYLE == 'ASSET_FOLDERS' %}selected{% endif %}>Asset Folders (Kometa Default)</option>
-                        <option value="NO_ASSET_FOLDERS" {% if cfg.ASSET_STYLE == 'NO_ASSET_FOLDERS' %}selected{% endif %}>No Asset Folders (Flat)</option>
+                        {{ select_options('asset_style', cfg.ASSET_STYLE) }}
                     </select>
                     <small style="color:var(--text-muted); display:block; margin-top:5px;">
                         <strong>Asset Folders:</strong> Movies/Show Name/poster.jpg<br>
@@ -1135,7 +2051,7 @@ def settings():
                         <div style="max-height: 200px; overflow-y: auto; background: #141719; border: 1px solid #4b5563; border-radius: 8px; padding: 10px;">
                             {% for lib in all_libs %}
                             <div style="display:flex; align-items:center; margin-bottom:8px;">
-                                <input type="checkbox" name="ignored_libs" value="{{ lib.title }}" id="lib_{{ loop.index }}" {% if lib.title in cfg.IGNORED_LIBRARIES %}checked{% endif %} style="width:auto; margin-right:10px;">
+                                <input type="checkbox" name="ignored_libs" value="{{ lib.title }}" id="lib_{{ loop.index }}" {% if lib.title in ignored_set %}checked{% endif %} style="width:auto; margin-right:10px;">
                                 <label for="lib_{{ loop.index }}" style="margin:0; font-weight:400; color:var(--text); cursor:pointer;">{{ lib.title }}</label>
                             </div>
                             {% endfor %}
@@ -1157,32 +2073,20 @@ def settings():
                         <div style="flex: 1; min-width: 150px;">
                             <label>Run On Day</label>
                             <select name="cron_day">
-                                <option value="DAILY" {% if cfg.CRON_DAY == 'DAILY' %}selected{% endif %}>Every Day</option>
-                                <option value="MONDAY" {% if cfg.CRON_DAY == 'MONDAY' %}selected{% endif %}>Monday</option>
-                                <option value="TUESDAY" {% if cfg.CRON_DAY == 'TUESDAY' %}selected{% endif %}>Tuesday</option>
-                                <option value="WEDNESDAY" {% if cfg.CRON_DAY == 'WEDNESDAY' %}selected{% endif %}>Wednesday</option>
-                                <option value="THURSDAY" {% if cfg.CRON_DAY == 'THURSDAY' %}selected{% endif %}>Thursday</option>
-                                <option value="FRIDAY" {% if cfg.CRON_DAY == 'FRIDAY' %}selected{% endif %}>Friday</option>
-                                <option value="SATURDAY" {% if cfg.CRON_DAY == 'SATURDAY' %}selected{% endif %}>Saturday</option>
-                                <option value="SUNDAY" {% if cfg.CRON_DAY == 'SUNDAY' %}selected{% endif %}>Sunday</option>
+                                {{ select_options('cron_day', cfg.CRON_DAY) }}
                             </select>
                         </div>
                         <div style="flex: 1; min-width: 220px;">
                             <label>Run At</label>
                             <div style="display:flex; gap:10px;">
                                 <select name="cron_hour" style="flex:1; min-width: 60px;">
-                                    {% for h in range(1, 13) %}
-                                        <option value="{{ '%02d' % h }}" {% if ('%02d' % h) == c_hour %}selected{% endif %}>{{ h }}</option>
-                                    {% endfor %}
+                                    {{ select_options('hour', c_hour) }}
                                 </select>
                                 <select name="cron_minute" style="flex:1; min-width: 60px;">
-                                    {% for m in range(0, 60) %}
-                                        <option value="{{ '%02d' % m }}" {% if ('%02d' % m) == c_minute %}selected{% endif %}>{{ '%02d' % m }}</option>
-                                    {% endfor %}
+                                    {{ select_options('minute', c_minute) }}
                                 </select>
                                 <select name="cron_ampm" style="flex:1; min-width: 60px;">
-                                    <option value="AM" {% if c_ampm == 'AM' %}selected{% endif %}>AM</option>
-                                    <option value="PM" {% if c_ampm == 'PM' %}selected{% endif %}>PM</option>
+                                    {{ select_options('ampm', c_ampm) }}
                                 </select>
                             </div>
                         </div>
@@ -1197,7 +2101,7 @@ def settings():
                             <div style="max-height: 150px; overflow-y: auto; background: #141719; border: 1px solid #4b5563; border-radius: 8px; padding: 10px;">
                                 {% for lib in all_libs %}
                                 <div style="display:flex; align-items:center; margin-bottom:8px;">
-                                    <input type="checkbox" name="cron_libs" value="{{ lib.title }}" id="cron_lib_{{ loop.index }}" {% if lib.title in cfg.CRON_LIBRARIES %}checked{% endif %} style="width:auto; margin-right:10px;">
+                                    <input type="checkbox" name="cron_libs" value="{{ lib.title }}" id="cron_lib_{{ loop.index }}" {% if lib.title in cron_set %}checked{% endif %} style="width:auto; margin-right:10px;">
                                     <label for="cron_lib_{{ loop.index }}" style="margin:0; font-weight:400; color:var(--text); cursor:pointer;">{{ lib.title }}</label>
                                 </div>
                                 {% endfor %}
@@ -1206,19 +2110,12 @@ def settings():
                     </div>
                     <div class="form-group"><label>Selection Mode</label>
                         <select name="cron_mode" onchange="updateCronUI()">
-                            <option value="RANDOM" {% if cfg.CRON_MODE == 'RANDOM' %}selected{% endif %}>Random (No Uploads)</option>
-                            <option value="SPECIFIC_PROVIDER" {% if cfg.CRON_MODE == 'SPECIFIC_PROVIDER' %}selected{% endif %}>First from Provider</option>
-                            <option value="RANDOM_PROVIDER" {% if cfg.CRON_MODE == 'RANDOM_PROVIDER' %}selected{% endif %}>Random from Provider</option>
+                            {{ select_options('cron_mode', cfg.CRON_MODE) }}
                         </select>
                     </div>
                     <div class="form-group" id="cron_provider_div"><label>Provider Name</label>
                         <select name="cron_provider">
-                            <option value="tmdb" {% if cfg.CRON_PROVIDER == 'tmdb' %}selected{% endif %}>TMDB</option>
-                            <option value="tvdb" {% if cfg.CRON_PROVIDER == 'tvdb' %}selected{% endif %}>TVDB</option>
-                            <option value="fanart" {% if cfg.CRON_PROVIDER == 'fanart' %}selected{% endif %}>Fanart.tv</option>
-                            <option value="gracenote" {% if cfg.CRON_PROVIDER == 'gracenote' %}selected{% endif %}>Gracenote</option>
-                            <option value="movieposterdb" {% if cfg.CRON_PROVIDER == 'movieposterdb' %}selected{% endif %}>MoviePosterDB</option>
-                            <option value="local" {% if cfg.CRON_PROVIDER == 'local' %}selected{% endif %}>Local</option>
+                            {{ select_options('cron_provider', cfg.CRON_PROVIDER) }}
                         </select>
                     </div>
                 </div>
@@ -1272,263 +2169,536 @@ def settings():
             {% endif %}
         </div>
     </div>
-    """
-    return render_template_string(HTML_TOP + content + HTML_BOTTOM, title="Settings", cfg=display_cfg, all_libs=all_libs, c_hour=c_hour, c_minute=c_minute, c_ampm=c_ampm, breadcrumbs=[('Settings', '#')], toggle_override=False, is_unconfigured=is_unconfigured, auth_disabled=auth_disabled)  # nosemgrep: render-template-string
+"""
+
+# Use a pure Jinja2 template so all item data is rendered via {{ }} with
+# autoescape — no user-derived content is concatenated into the template
+# string itself (eliminates CodeQL SSTI and XSS findings).
+LIBRARY_TPL = """
+{% macro pager() %}<div class="pagination" style="margin:30px 0;border-top:1px solid #444;padding-top:20px">
+  <div style="display:flex;align-items:center;justify-content:center;gap:15px">
+    {% if page > 1 %}<a href="?page={{ page - 1 }}" class="page-btn">&laquo; Prev</a>
+    {% else %}<span class="page-btn" style="opacity:0.5;cursor:not-allowed">&laquo; Prev</span>{% endif %}
+    <form action="" method="get" style="display:flex;align-items:center;gap:10px;margin:0">
+      <label style="margin:0;color:var(--text-muted)">Page</label>
+      <select name="page" onchange="this.form.submit()" style="padding:8px;border-radius:6px;background:var(--bg);color:var(--text);border:1px solid #4b5563;cursor:pointer;min-width:80px">
+        {{ page_options(total_pages, page) }}
+      </select>
+      <span style="color:var(--text-muted)">of {{ total_pages }}</span>
+    </form>
+    {% if page < total_pages %}<a href="?page={{ page + 1 }}" class="page-btn">Next &raquo;</a>
+    {% else %}<span class="page-btn" style="opacity:0.5;cursor:not-allowed">Next &raquo;</span>{% endif %}
+  </div>
+</div>{% endmacro %}
+{% set pager_html = pager() %}
+{% macro grid(items, style='') %}<div class="grid">{% for i in items %}<a href="/item/{{ i.ratingKey }}" class="card"{% if style %} style="{{ style }}"{% endif %}><img src="{{ i.thumbUrl }}" loading="lazy" onerror="this.onerror=null;this.src='{{ missing_img }}'"><div class="title">{{ i.title }}</div></a>{% endfor %}</div>{% endmacro %}
+{{ pager_html }}
+{% if todo_items %}
+<div class="section-header"><h2>Missing Posters</h2><span>{{ todo_items|length }} on page</span></div>
+{{ grid(todo_items) }}
+{% endif %}
+{% if partial_items %}
+<div class="section-header"><h2 style="color:var(--warning)">Half Missing</h2><span>{{ partial_items|length }} on page</span></div>
+{{ grid(partial_items, 'border:2px solid var(--warning)') }}
+{% endif %}
+{% if done_items_list %}
+<div class="section-header"><h2 style="color:var(--accent)">Already Downloaded</h2><span>{{ done_items_list|length }} total</span></div>
+{{ grid(done_items_list, 'opacity:0.7') }}
+{% endif %}
+{% if not todo_items and not partial_items and not done_items_list %}<p>No items found.</p>{% endif %}
+{{ pager_html }}
+"""
+
+# Poster/background pickers shared by the item and season pages.
+ARTWORK_TPL = """
+{% macro cards(images, img_type, selected) %}{% for url, provider, key in images %}{% set is_sel = url == selected %}
+<form action="/download" method="post" class="{{ img_type }}-card{% if is_sel %} selected{% endif %}">
+    <div class="img-container">{% if is_sel %}<div class="selected-badge">CURRENT</div>{% endif %}<img src="{{ url }}" loading="lazy"><div class="provider-badge">{{ provider }}</div></div>
+    <input type="hidden" name="poster_key" value="{{ key }}">
+    <input type="hidden" name="rating_key" value="{{ rating_key }}">
+    <input type="hidden" name="img_type" value="{{ img_type }}">
+    <button type="submit" class="btn">Download</button>
+</form>{% endfor %}{% endmacro %}
+<div class="path-info">{{ path_label }}: <strong>.../{{ rel_path }}/</strong></div>
+<div class="tabs">
+    <button class="tab-btn active" onclick="switchTab('tab-posters')">Posters</button>
+    <button class="tab-btn" onclick="switchTab('tab-backgrounds')">Backgrounds</button>
+</div>
+<div id="tab-posters" class="tab-content active"><div class="poster-grid">{{ cards(posters, 'poster', sel_poster) }}</div></div>
+<div id="tab-backgrounds" class="tab-content"><div class="background-grid">{{ cards(backgrounds, 'background', sel_bg) }}</div></div>
+{% if seasons is not none %}
+<div class="section-header"><h2>Seasons</h2></div>
+<div class="grid">{% for s in seasons %}<a href="/season/{{ s.ratingKey }}" class="card"><img src="{{ s.thumbUrl }}" loading="lazy" onerror="this.onerror=null;this.src='{{ missing_img }}'"><div class="title">{{ s.title }}</div></a>{% endfor %}</div>
+{% endif %}
+"""
+
+NOT_FOUND_TPL = """
+        <div class="not-found">
+            <h1>404</h1>
+            <p>Page not found. <a href="/">Go Home</a></p>
+        </div>
+"""
+
+def _page(body):
+    return '{% extends "layout.html" %}{% block content %}' + body + '{% endblock %}'
+
+# Every page is registered once with the app's Jinja loader and compiled at
+# import (below). Pages extend one shared layout, so the header/nav is compiled
+# only once; its static markup is emitted as constant strings, so rendering
+# the shell apart from the body and joining them would not be any faster.
+TEMPLATES = {
+    'layout.html': HTML_TOP + "{% block content %}{% endblock %}" + HTML_BOTTOM,
+    'home.html': _page(HOME_TPL),
+    'settings.html': _page(SETTINGS_TPL),
+    'library.html': _page(LIBRARY_TPL),
+    'artwork.html': _page(ARTWORK_TPL),
+    '404.html': _page(NOT_FOUND_TPL),
+    'auth.html': HTML_LOGIN_SETUP,
+}
+app.jinja_loader = DictLoader(TEMPLATES)
+# Compile every page at import so no request pays the parse/compile cost;
+# with auto_reload off they stay compiled for the life of the process.
+for _name in TEMPLATES: app.jinja_env.get_template(_name)
+
+# The login and setup pages only vary by their flash messages, so both are
+# rendered once here and the messages are spliced into a placeholder.
+_FLASH_SLOT = '<!--FLASH-->'
+
+def _prerender_auth(**ctx):
+    return app.jinja_env.get_template('auth.html').render(flash_html=Markup(_FLASH_SLOT), **ctx)
+
+AUTH_PAGES = {
+    'login': _prerender_auth(title="Login", subtitle="Please sign in to continue.", btn_text="Sign In", is_setup=False),
+    'setup': _prerender_auth(title="Setup Admin", subtitle="Create your admin account to secure access.", btn_text="Create Account", is_setup=True),
+}
+
+def render_auth_page(name):
+    flashes = ''.join(f'<div class="flash" style="text-align:center">{escape(m)}</div>' for m in get_flashed_messages())
+    return AUTH_PAGES[name].replace(_FLASH_SLOT, flashes)
+
+@app.route('/')
+def home():
+    if not plex:
+        flash("Please configure your Plex Server connection.")
+        return redirect(url_for('settings'))
+    try:
+        libs = get_sections()
+    except:
+        flash("Connection lost. Please check settings.")
+        return redirect(url_for('settings'))
+
+    cfg = get_config(copy=False)
+    ignored = set(cfg.get('IGNORED_LIBRARIES') or ())
+    visible_libs = [lib for lib in libs if lib.title not in ignored]
+    
+    # Gathered in the background from here on, and consumed while the page
+    # streams, so the head and library grid are sent while the (slower)
+    # per-library stats are still being worked out.
+    all_stats = get_all_library_stats(visible_libs)
+    def lib_stats():
+        for lib, stats in zip(visible_libs, all_stats):
+            yield {
+                'title': lib.title,
+                'content': stats['content_str'],
+                'posters': stats['downloaded_count'],
+                'backgrounds': stats['bg_downloaded_count'],
+                'size': stats['size_str']
+            }
+
+    return render_streamed('home.html', visible_libs=visible_libs, lib_stats=lib_stats(), title="Select a Library", breadcrumbs=[], toggle_override=False)
+
+@app.route('/api/search')
+def api_search():
+    if not plex: return jsonify([])
+    query = request.args.get('q', '')
+    if len(query) < 2: return jsonify([])
+    key = query.strip().lower()
+    hit = _search_cache.get(key)
+    if hit and hit[0] > time.time():
+        # The tag is stored with the body, so repeats are neither re-hashed
+        # nor, when the browser already has them, re-sent.
+        resp = not_modified(hit[2]) or app.response_class(hit[1], mimetype='application/json')
+        resp.set_etag(hit[2], weak=True)
+        resp.headers['Cache-Control'] = _SEARCH_CACHE_CONTROL
+        return resp
+    try:
+        results = plex.search(query, limit=20)
+        data = []
+        for item in results:
+            if item.type not in ['movie', 'show']: continue
+            # null when Plex has no artwork, so the client uses the local placeholder
+            # straight away instead of requesting a URL that is bound to fail.
+            thumb = get_thumb_url(item) or None
+            year = getattr(item, 'year', '')
+            data.append({
+                'title': item.title,
+                'year': year,
+                'ratingKey': item.ratingKey,
+                'thumb': thumb,
+                'type': item.type
+            })
+            if len(data) >= 10: break
+        resp = jsonify(data)
+        if len(_search_cache) >= _SEARCH_CACHE_MAX: _search_cache.pop(next(iter(_search_cache), None), None)
+        body = resp.get_data()
+        etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+        _search_cache[key] = (time.time() + _SEARCH_CACHE_TTL, body, etag)
+        resp.set_etag(etag, weak=True)
+        resp.headers['Cache-Control'] = _SEARCH_CACHE_CONTROL
+        return resp
+    except: return jsonify([])
+
+@app.route('/setup', methods=['GET', 'POST'])
+def setup():
+    cfg = get_config()
+    if 'AUTH_USER' in cfg and cfg['AUTH_USER']: return redirect(url_for('login'))
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        confirm = request.form['confirm_password']
+        if password != confirm: flash("Passwords do not match.")
+        elif len(password) < 4: flash("Password must be at least 4 characters.")
+        else:
+            cfg['AUTH_USER'] = username
+            cfg['AUTH_HASH'] = hash_password(password)
+            cfg['AUTH_DISABLED'] = False
+            save_config(cfg)
+            flash("Account created! Please login.")
+            return redirect(url_for('login'))
+    return render_auth_page('setup')
+
+@app.route('/login', methods=['GET', 'POST'])
+def login():
+    cfg = get_config(copy=False)
+    if cfg.get('AUTH_DISABLED', False): return redirect(url_for('home'))
+    if 'user' in session: return redirect(url_for('home'))
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        stored_user = cfg.get('AUTH_USER')
+        stored_hash = cfg.get('AUTH_HASH')
+        if username == stored_user and verify_password(stored_hash, password):
+            if password_needs_rehash(stored_hash):
+                # A copy: the copy=False dict above is the shared config cache.
+                new_cfg = get_config()
+                new_cfg['AUTH_HASH'] = hash_password(password)
+                save_config(new_cfg)
+            session.permanent = True
+            session['user'] = username
+            return redirect(url_for('home'))
+        else: flash("Invalid username or password.")
+    return render_auth_page('login')
+
+@app.route('/logout')
+def logout():
+    session.clear()
+    return redirect(url_for('login'))
+
+@app.route('/settings', methods=['GET', 'POST'])
+def settings():
+    cfg = get_config()
+    is_unconfigured = 'AUTH_USER' not in cfg or not cfg['AUTH_USER']
+    auth_disabled = cfg.get('AUTH_DISABLED', False)
+    
+    if request.method == 'POST':
+        # Require authentication for all POST actions unless the system has no account yet.
+        # create_account is additionally restricted to only work when unconfigured.
+        if not is_unconfigured and not auth_disabled and 'user' not in session:
+            return redirect(url_for('login'))
+
+        action = request.form.get('action')
+        if action == 'create_account' and not is_unconfigured:
+            flash("An account already exists. Use change_password to update credentials.")
+            return redirect(url_for('settings'))
+        if action == 'update_config':
+            cfg['PLEX_URL'] = request.form.get('plex_url', '').strip()
+            # Handle Token Update: Only update if not the placeholder
+            token_input = request.form.get('plex_token', '').strip()
+            if token_input and token_input != '(Encrypted)':
+                cfg['PLEX_TOKEN'] = token_input
+            
+            cfg['DOWNLOAD_BASE_DIR'] = request.form.get('download_dir', 'downloaded_posters').strip()
+            cfg['HISTORY_FILE'] = request.form.get('history_file', 'download_history.json').strip()
+            cfg['ASSET_STYLE'] = request.form.get('asset_style', 'ASSET_FOLDERS')
+            cfg['CRON_ENABLED'] = (request.form.get('cron_enabled') == 'on')
+            
+            # Time Handling
+            day = request.form.get('cron_day', 'DAILY')
+            # 12h to 24h Conversion
+            h_12 = int(request.form.get('cron_hour', '12'))
+            m = int(request.form.get('cron_minute', '00'))
+            ampm = request.form.get('cron_ampm', 'AM')
+            
+            h_24 = h_12 % 12 + (12 if ampm == 'PM' else 0)
+            
+            cfg['CRON_DAY'] = day
+            cfg['CRON_TIME'] = f"{h_24:02d}:{m:02d}"
+            
+            cfg['CRON_TZ'] = request.form.get('cron_tz', 'Local').strip()
+
+            cfg['CRON_MODE'] = request.form.get('cron_mode', 'RANDOM')
+            cfg['CRON_PROVIDER'] = request.form.get('cron_provider', '').strip()
+            cfg['CRON_DOWNLOAD_BACKGROUNDS'] = (request.form.get('cron_download_backgrounds') == 'on')
+            cfg['VERBOSE_LOGGING'] = (request.form.get('cron_logging') == 'on')
+            cfg['IGNORED_LIBRARIES'] = request.form.getlist('ignored_libs')
+            cfg['CRON_LIBRARIES'] = request.form.getlist('cron_libs')
+            save_config(cfg)
+            if init_plex(): flash("Settings saved and connected!")
+            else: flash("Settings saved but connection failed.")
+            return redirect(url_for('home'))
+        elif action == 'migrate_assets':
+            target_style = request.form.get('target_style')
+            count, error = perform_migration(target_style)
+            if error: flash(f"Migration error: {error}")
+            else:
+                # perform_migration() rejects unknown styles, so only a valid one is saved.
+                flash(f"Migrated {count} files.")
+                cfg['ASSET_STYLE'] = target_style
+                save_config(cfg)
+        elif action == 'change_password':
+            current_pw = request.form.get('current_password')
+            new_pw = request.form.get('new_password')
+            confirm_pw = request.form.get('confirm_password')
+            stored_hash = cfg.get('AUTH_HASH')
+            if not verify_password(stored_hash, current_pw): flash("Current password incorrect.")
+            elif new_pw != confirm_pw: flash("New passwords do not match.")
+            elif len(new_pw) < 4: flash("Password too short.")
+            else:
+                cfg['AUTH_HASH'] = hash_password(new_pw)
+                save_config(cfg)
+                flash("Password updated.")
+        elif action == 'create_account':
+            username = request.form.get('new_username')
+            new_pw = request.form.get('new_password')
+            confirm_pw = request.form.get('confirm_password')
+            if new_pw != confirm_pw: flash("Passwords do not match.")
+            elif len(new_pw) < 4: flash("Password too short.")
+            else:
+                cfg['AUTH_USER'] = username
+                cfg['AUTH_HASH'] = hash_password(new_pw)
+                cfg['AUTH_DISABLED'] = False
+                save_config(cfg)
+                session.permanent = True
+                session['user'] = username
+                flash("Account created!")
+                return redirect(url_for('home'))
+        elif action == 'disable_auth':
+            if is_unconfigured:
+                cfg['AUTH_DISABLED'] = True
+                save_config(cfg)
+                return redirect(url_for('home'))
+            else:
+                current_pw = request.form.get('current_password_disable')
+                stored_hash = cfg.get('AUTH_HASH')
+                if not verify_password(stored_hash, current_pw): flash("Incorrect password.")
+                else:
+                    cfg['AUTH_DISABLED'] = True
+                    cfg.pop('AUTH_USER', None)
+                    cfg.pop('AUTH_HASH', None)
+                    save_config(cfg)
+                    session.clear()
+                    return redirect(url_for('home'))
+        return redirect(url_for('settings'))
+
+    # Only the page needs the sections; POSTs redirect without them.
+    all_libs = []
+    if plex:
+        try: all_libs = get_sections()
+        except: pass
+
+    # Helper for Time Selects (24h -> 12h)
+    cron_time = cfg.get('CRON_TIME', '03:00')
+    try:
+        h_24, m = map(int, cron_time.split(':'))
+        c_hour, c_minute = f"{(h_24 + 11) % 12 + 1:02d}", f"{m:02d}"
+        c_ampm = 'AM' if h_24 < 12 else 'PM'
+    except (ValueError, AttributeError):
+        c_hour, c_minute, c_ampm = '03', '00', 'AM'
+
+    # Prepare config for display (mask token)
+    display_cfg = cfg.copy()
+    if display_cfg['PLEX_TOKEN']:
+        display_cfg['PLEX_TOKEN'] = '(Encrypted)'
+
+    return render_template('settings.html', title="Settings", cfg=display_cfg, all_libs=all_libs, c_hour=c_hour, c_minute=c_minute, c_ampm=c_ampm, breadcrumbs=[('Settings', '#')], toggle_override=False, is_unconfigured=is_unconfigured, auth_disabled=auth_disabled,
+                           ignored_set=set(cfg.get('IGNORED_LIBRARIES') or ()), cron_set=set(cfg.get('CRON_LIBRARIES') or ()))
 
 @app.route('/library/<lib_id>')
 def view_library(lib_id):
     if not plex: return redirect(url_for('settings'))
     try: lib = plex.library.sectionByID(int(lib_id))
     except: return redirect('/')
+    lib_title = lib.title
     
     page = request.args.get('page', 1, type=int)
+    if page < 1: return redirect(url_for('view_library', lib_id=lib_id, page=1))
     per_page = 50
     offset = (page - 1) * per_page
-    total_items = lib.totalSize
-    items = lib.search(maxresults=per_page, container_start=offset)
+    ctx = path_context()
+    # Only title/ratingKey/thumb are used, so skip the external guids. The
+    # search response already carries totalSize; lib.totalSize is another request.
+    # The library folder walk runs while the search is in flight.
+    f_items = plex_pool.submit(lib.search, maxresults=per_page, container_start=offset, includeGuids=False)
+    existing = build_existing_poster_index(ctx.base_dir, lib_title)
+    items = f_items.result()
+    total_items = getattr(items, 'totalSize', None) or lib.totalSize
     total_pages = math.ceil(total_items / per_page)
+    # Past the end: bounce to the last page before any history/status work.
+    if total_pages and page > total_pages: return redirect(url_for('view_library', lib_id=lib_id, page=total_pages))
     
+    # Nothing the page shows has changed: answer 304 without classifying items.
+    page_key = (lib.key, page, total_items, hash(existing), tuple((i.ratingKey, i.title, i.thumb, getattr(i, 'childCount', None)) for i in items))
+    resp = not_modified(page_etag(*page_key))
+    if resp: return resp
     history = load_history_data()
-    all_keys = list(history['downloads'].keys()) + list(history['overrides'])
-    valid_keys = [int(k) for k in set(all_keys) if k.isdigit()]
-    
-    done_objs = []
-    if valid_keys:
-        try: done_objs = lib.search(id=valid_keys)
-        except: pass
     
-    done_ids_map = {item.ratingKey: item for item in done_objs}
-    
-    # Self Healing
-    keys_rm = []
-    for key, item in list(done_ids_map.items()):
-        if get_item_status(item, lib.title) != 'complete': keys_rm.append(key)
-    if keys_rm:
-        for k in keys_rm:
-            del done_ids_map[k]
-            if str(k) in history['downloads']: del history['downloads'][str(k)]
-            if str(k) in history['overrides']: history['overrides'].remove(str(k))
-        save_history_data(history)
+    # The "Already Downloaded" list only changes with the history or the files
+    # on disk, so reuse it across pages until either does.
+    cached = _done_cache.get(lib.key)
+    if cached and time.monotonic() - cached[5] >= _SECTIONS_TTL: cached = None
+    if cached and cached[0] is history['_rating_keys'] and cached[1] is existing:
+        done_ids_map, done_items_list, checked, fetched_at = dict(cached[2]), cached[3], cached[4], cached[5]
+        statuses = get_item_statuses(items, lib_title, history, ctx)
+    else:
+        keys = history['_rating_keys']
+        if cached:
+            # Keys resolved on a recent visit (including ones that turned out
+            # to belong to another library) are not fetched again; only keys
+            # added to the history since then are.
+            done_objs = [o for k, o in cached[2].items() if k in keys]
+            checked, fetched_at = cached[4] & keys, cached[5]
+        else:
+            done_objs, checked, fetched_at = [], frozenset(), time.monotonic()
+        valid_keys = list(keys - checked)
+        if valid_keys:
+            # One /library/metadata/<k1,k2,...> request per chunk, not per item.
+            # History spans every library and includes seasons, so keep only
+            # this library's top-level items (as lib.search(id=...) did).
+            chunks = [valid_keys[i:i + _FETCH_CHUNK] for i in range(0, len(valid_keys), _FETCH_CHUNK)]
+            fetched = []
+            try:
+                lib_type, lib_key = lib.type, lib.key
+                for batch in plex_pool.map(plex.fetchItems, chunks):
+                    fetched.extend(x for x in batch if x.type == lib_type and getattr(x, 'librarySectionID', None) == lib_key)
+                checked = keys
+            except: fetched = []
+            done_objs.extend(fetched)
+        
+        done_ids_map = {item.ratingKey: item for item in done_objs}
+        done_items_list = None
+        statuses = get_item_statuses(done_objs + list(items), lib_title, history, ctx)
+        
+        # Self Healing
+        keys_rm = [key for key in done_ids_map if statuses[key] != 'complete']
+        if keys_rm:
+            checked = checked - set(keys_rm)
+            for k in keys_rm: del done_ids_map[k]
+            rm = {str(k) for k in keys_rm}
+            for k in rm: history['downloads'].pop(k, None)
+            # One pass over the overrides list rather than a list.remove() per key.
+            if not rm.isdisjoint(history['_overrides_set']):
+                history['overrides'] = [k for k in history['overrides'] if k not in rm]
+                history['_overrides_set'] -= rm
+            save_history_data(history)
 
     todo_items = []
     partial_items = []
     new_found = []
     
     for i in items:
-        status = get_item_status(i, lib.title)
+        rk = i.ratingKey
+        status = statuses[rk]
         if status == 'complete':
-            if i.ratingKey not in done_ids_map:
-                done_ids_map[i.ratingKey] = i
-                new_found.append(i.ratingKey)
-        elif status == 'partial':
-            thumb = i.thumbUrl if i.thumb else ''
-            partial_items.append({'title': i.title, 'ratingKey': i.ratingKey, 'thumbUrl': thumb})
-        else:
-            thumb = i.thumbUrl if i.thumb else ''
-            todo_items.append({'title': i.title, 'ratingKey': i.ratingKey, 'thumbUrl': thumb})
+            if rk not in done_ids_map:
+                done_ids_map[rk] = i
+                new_found.append(rk)
+        elif status == 'partial': partial_items.append(item_card(i))
+        else: todo_items.append(item_card(i))
 
     if new_found:
         for k in new_found: history['downloads'][str(k)] = "restored"
         save_history_data(history)
 
-    done_items_list = []
-    for key, item in done_ids_map.items():
-        thumb = item.thumbUrl if item.thumb else ''
-        done_items_list.append({'title': item.title, 'ratingKey': item.ratingKey, 'thumbUrl': thumb})
-    done_items_list.sort(key=lambda x: x['title'])
-
-    # Use a pure Jinja2 template so all item data is rendered via {{ }} with
-    # autoescape — no user-derived content is concatenated into the template
-    # string itself (eliminates CodeQL SSTI and XSS findings).
-    LIBRARY_TPL = """
-<div class="pagination" style="margin:30px 0;border-top:1px solid #444;padding-top:20px">
-  <div style="display:flex;align-items:center;justify-content:center;gap:15px">
-    {% if page > 1 %}<a href="?page={{ page - 1 }}" class="page-btn">&laquo; Prev</a>
-    {% else %}<span class="page-btn" style="opacity:0.5;cursor:not-allowed">&laquo; Prev</span>{% endif %}
-    <form action="" method="get" style="display:flex;align-items:center;gap:10px;margin:0">
-      <label style="margin:0;color:var(--text-muted)">Page</label>
-      <select name="page" onchange="this.form.submit()" style="padding:8px;border-radius:6px;background:var(--bg);color:var(--text);border:1px solid #4b5563;cursor:pointer;min-width:80px">
-        {% for p in range(1, total_pages + 1) %}<option value="{{ p }}"{% if p == page %} selected{% endif %}>{{ p }}</option>{% endfor %}
-      </select>
-      <span style="color:var(--text-muted)">of {{ total_pages }}</span>
-    </form>
-    {% if page < total_pages %}<a href="?page={{ page + 1 }}" class="page-btn">Next &raquo;</a>
-    {% else %}<span class="page-btn" style="opacity:0.5;cursor:not-allowed">Next &raquo;</span>{% endif %}
-  </div>
-</div>
-{% if todo_items %}
-<div class="section-header"><h2>Missing Posters</h2><span>{{ todo_items|length }} on page</span></div>
-<div class="grid">{% for i in todo_items %}<a href="/item/{{ i.ratingKey }}" class="card"><img src="{{ i.thumbUrl }}" loading="lazy" onerror="this.src='https://via.placeholder.com/200x300?text=No+Img'"><div class="title">{{ i.title }}</div></a>{% endfor %}</div>
-{% endif %}
-{% if partial_items %}
-<div class="section-header"><h2 style="color:var(--warning)">Half Missing</h2><span>{{ partial_items|length }} on page</span></div>
-<div class="grid">{% for i in partial_items %}<a href="/item/{{ i.ratingKey }}" class="card" style="border:2px solid var(--warning)"><img src="{{ i.thumbUrl }}" loading="lazy" onerror="this.src='https://via.placeholder.com/200x300?text=No+Img'"><div class="title">{{ i.title }}</div></a>{% endfor %}</div>
-{% endif %}
-{% if done_items_list %}
-<div class="section-header"><h2 style="color:var(--accent)">Already Downloaded</h2><span>{{ done_items_list|length }} total</span></div>
-<div class="grid">{% for i in done_items_list %}<a href="/item/{{ i.ratingKey }}" class="card" style="opacity:0.7"><img src="{{ i.thumbUrl }}" loading="lazy" onerror="this.src='https://via.placeholder.com/200x300?text=No+Img'"><div class="title">{{ i.title }}</div></a>{% endfor %}</div>
-{% endif %}
-{% if not todo_items and not partial_items and not done_items_list %}<p>No items found.</p>{% endif %}
-<div class="pagination" style="margin:30px 0;border-top:1px solid #444;padding-top:20px">
-  <div style="display:flex;align-items:center;justify-content:center;gap:15px">
-    {% if page > 1 %}<a href="?page={{ page - 1 }}" class="page-btn">&laquo; Prev</a>
-    {% else %}<span class="page-btn" style="opacity:0.5;cursor:not-allowed">&laquo; Prev</span>{% endif %}
-    <form action="" method="get" style="display:flex;align-items:center;gap:10px;margin:0">
-      <label style="margin:0;color:var(--text-muted)">Page</label>
-      <select name="page" onchange="this.form.submit()" style="padding:8px;border-radius:6px;background:var(--bg);color:var(--text);border:1px solid #4b5563;cursor:pointer;min-width:80px">
-        {% for p in range(1, total_pages + 1) %}<option value="{{ p }}"{% if p == page %} selected{% endif %}>{{ p }}</option>{% endfor %}
-      </select>
-      <span style="color:var(--text-muted)">of {{ total_pages }}</span>
-    </form>
-    {% if page < total_pages %}<a href="?page={{ page + 1 }}" class="page-btn">Next &raquo;</a>
-    {% else %}<span class="page-btn" style="opacity:0.5;cursor:not-allowed">Next &raquo;</span>{% endif %}
-  </div>
-</div>
-"""
-    return render_template_string(HTML_TOP + LIBRARY_TPL + HTML_BOTTOM,  # nosemgrep: render-template-string
-                                  title=lib.title, breadcrumbs=[(lib.title, '#')],
-                                  toggle_override=False,
-                                  todo_items=todo_items, partial_items=partial_items,
-                                  done_items_list=done_items_list,
-                                  page=page, total_pages=total_pages)
+    if done_items_list is None:
+        done_items_list = sorted(map(item_card, done_ids_map.values()), key=_card_title)
+    elif new_found:
+        # Slot this page's newly found items into the cached, already sorted list.
+        done_items_list = list(done_items_list)
+        for k in new_found:
+            bisect.insort(done_items_list, item_card(done_ids_map[k]), key=_card_title)
+    _done_cache[lib.key] = (load_history_data(copy=False)['_rating_keys'], existing, done_ids_map, done_items_list, checked | done_ids_map.keys(), fetched_at)
+
+    resp = app.response_class(render_streamed('library.html',
+                           title=lib_title, breadcrumbs=[(lib_title, '#')],
+                           toggle_override=False,
+                           todo_items=todo_items, partial_items=partial_items,
+                           done_items_list=done_items_list,
+                           page=page, total_pages=total_pages), mimetype='text/html')
+    # Streamed, so add_conditional_etag skips it; the 304 is answered above.
+    resp.cache_control.no_cache = True
+    # Computed after any self-healing history writes so it matches the next visit.
+    etag = page_etag(*page_key)
+    if etag: resp.set_etag(etag, weak=True)
+    return resp
 
 @app.route('/item/<rating_key>')
 def view_item(rating_key):
     if not plex: return redirect(url_for('settings'))
-    try: item = plex.fetchItem(int(rating_key))
+    try: item = fetch_item(rating_key)
     except: return "Not Found", 404
     
     is_show = item.type == 'show'
-    posters = item.posters()
-    backgrounds = item.arts()
+    # These Plex requests are independent, so overlap them on the shared pool.
+    f_posters, f_arts = plex_pool.submit(item.posters), plex_pool.submit(item.arts)
+    f_seasons = plex_pool.submit(item.seasons) if is_show else None
     folder_name = get_physical_folder_name(item)
-    lib = item.section()
-    
-    sel_poster = get_history_url(rating_key, 'poster')
-    sel_bg = get_history_url(rating_key, 'background')
+    lib_key, lib_title = item_library(item)
+    posters, backgrounds = f_posters.result(), f_arts.result()
     
-    if sel_poster and not check_file_exists(item, lib.title, 'poster'): sel_poster = None
-    if sel_bg and not check_file_exists(item, lib.title, 'background'): sel_bg = None
+    history = load_history_data(copy=False)
+    ctx = path_context()
+    sel_poster = get_history_url(rating_key, 'poster', history)
+    sel_bg = get_history_url(rating_key, 'background', history)
     
-    seasons = item.seasons() if is_show else []
-    target_path = get_target_file_path(item, lib.title)
+    if sel_poster and not check_file_exists(item, lib_title, 'poster', ctx=ctx): sel_poster = None
+    if sel_bg and not check_file_exists(item, lib_title, 'background', ctx=ctx): sel_bg = None
     
-    cfg = get_config()
-    base_dir = cfg.get('DOWNLOAD_BASE_DIR', '')
-    if not os.path.isabs(base_dir) and DATA_DIR != '.': base_dir = os.path.join(DATA_DIR, base_dir)
-    rel_path = os.path.relpath(os.path.dirname(target_path), base_dir) if target_path else "Unknown"
-
-    content = f"""
-    <div class="path-info">Target Folder: <strong>.../{safe_html(rel_path)}/</strong></div>
-    <div class="tabs">
-        <button class="tab-btn active" onclick="switchTab('tab-posters')">Posters</button>
-        <button class="tab-btn" onclick="switchTab('tab-backgrounds')">Backgrounds</button>
-    </div>
+    seasons = f_seasons.result() if is_show else []
+    target_path = get_target_file_path(item, lib_title, ctx=ctx)
+    rel_path = target_rel_dir(target_path, ctx.base_dir)
+    season_cards = [{'title': s.title, 'ratingKey': s.ratingKey, 'thumbUrl': get_thumb_url(s)} for s in seasons] if is_show else None
 
-    <div id="tab-posters" class="tab-content active"><div class="poster-grid">"""
-    for p in posters:
-        p_url = get_poster_url(p)
-        sel_class = 'selected' if p_url == sel_poster else ''
-        badge = f'<div class="selected-badge">CURRENT</div>' if sel_class else ''
-        content += f"""
-        <form action="/download" method="post" class="poster-card {sel_class}">
-            <div class="img-container">
-                {badge}
-                <img src="{safe_html(p_url)}" loading="lazy">
-                <div class="provider-badge">{safe_html(format_provider(p.provider))}</div>
-            </div>
-            <input type="hidden" name="poster_key" value="{safe_html(getattr(p, 'key', ''))}">
-            <input type="hidden" name="rating_key" value="{item.ratingKey}">
-            <input type="hidden" name="img_type" value="poster">
-            <button type="submit" class="btn">Download</button>
-        </form>"""
-    content += "</div></div>"
-
-    content += """<div id="tab-backgrounds" class="tab-content"><div class="background-grid">"""
-    for bg in backgrounds:
-        b_url = get_poster_url(bg)
-        sel_class = 'selected' if b_url == sel_bg else ''
-        badge = f'<div class="selected-badge">CURRENT</div>' if sel_class else ''
-        content += f"""
-        <form action="/download" method="post" class="background-card {sel_class}">
-            <div class="img-container">
-                {badge}
-                <img src="{safe_html(b_url)}" loading="lazy">
-                <div class="provider-badge">{safe_html(format_provider(bg.provider))}</div>
-            </div>
-            <input type="hidden" name="poster_key" value="{safe_html(getattr(bg, 'key', ''))}">
-            <input type="hidden" name="rating_key" value="{item.ratingKey}">
-            <input type="hidden" name="img_type" value="background">
-            <button type="submit" class="btn">Download</button>
-        </form>"""
-    content += "</div></div>"
-
-    if is_show:
-        content += f"""<div class="section-header"><h2>Seasons</h2></div><div class="grid">"""
-        for s in seasons:
-            thumb = s.thumbUrl if s.thumb else ''
-            content += f"""<a href="/season/{s.ratingKey}" class="card"><img src="{safe_html(thumb)}" loading="lazy"><div class="title">{safe_html(s.title)}</div></a>"""
-        content += "</div>"
-        
-    return render_template_string(HTML_TOP + "{{ page_content }}" + HTML_BOTTOM, page_content=Markup(content), title=item.title, breadcrumbs=[(lib.title, f'/library/{lib.key}'), (item.title, '#')],  # nosemgrep: render-template-string,explicit-unescape-with-markup
-                                  rating_key=item.ratingKey, toggle_override=is_show, is_overridden=is_overridden(item.ratingKey))
+    return render_template('artwork.html', path_label="Target Folder", rel_path=rel_path,
+                           posters=art_cards(posters), backgrounds=art_cards(backgrounds),
+                           sel_poster=sel_poster, sel_bg=sel_bg, seasons=season_cards,
+                           title=item.title, breadcrumbs=[(lib_title, f'/library/{lib_key}'), (item.title, '#')],
+                           rating_key=item.ratingKey, toggle_override=is_show, is_overridden=is_overridden(item.ratingKey, history))
 
 @app.route('/season/<rating_key>')
 def view_season(rating_key):
     if not plex: return redirect(url_for('settings'))
-    season = plex.fetchItem(int(rating_key))
-    show = season.show()
-    posters = season.posters()
-    backgrounds = season.arts()
-    lib = show.section()
+    season = fetch_item(rating_key)
+    f_posters, f_arts = plex_pool.submit(season.posters), plex_pool.submit(season.arts)
+    # Usually the show page was just opened, so this is a cache hit.
+    show = fetch_item(season.parentRatingKey)
+    lib_key, lib_title = item_library(season)
+    posters, backgrounds = f_posters.result(), f_arts.result()
     
-    sel_poster = get_history_url(rating_key, 'poster')
-    sel_bg = get_history_url(rating_key, 'background')
+    history = load_history_data(copy=False)
+    ctx = path_context()
+    sel_poster = get_history_url(rating_key, 'poster', history)
+    sel_bg = get_history_url(rating_key, 'background', history)
     
-    if sel_poster and not check_file_exists(season, lib.title, 'poster'): sel_poster = None
-    if sel_bg and not check_file_exists(season, lib.title, 'background'): sel_bg = None
+    if sel_poster and not check_file_exists(season, lib_title, 'poster', ctx=ctx): sel_poster = None
+    if sel_bg and not check_file_exists(season, lib_title, 'background', ctx=ctx): sel_bg = None
     
-    target_path = get_target_file_path(season, lib.title)
-    cfg = get_config()
-    base_dir = cfg.get('DOWNLOAD_BASE_DIR', '')
-    if not os.path.isabs(base_dir) and DATA_DIR != '.': base_dir = os.path.join(DATA_DIR, base_dir)
-    rel_path = os.path.relpath(os.path.dirname(target_path), base_dir) if target_path else "Unknown"
-    
-    content = f"""
-    <div class="path-info">Target: <strong>.../{safe_html(rel_path)}/</strong></div>
-    <div class="tabs"><button class="tab-btn active" onclick="switchTab('tab-posters')">Posters</button><button class="tab-btn" onclick="switchTab('tab-backgrounds')">Backgrounds</button></div>
-
-    <div id="tab-posters" class="tab-content active"><div class="poster-grid">"""
-    for p in posters:
-        p_url = get_poster_url(p)
-        sel_class = 'selected' if p_url == sel_poster else ''
-        badge = f'<div class="selected-badge">CURRENT</div>' if sel_class else ''
-        content += f"""
-        <form action="/download" method="post" class="poster-card {sel_class}">
-            <div class="img-container">{badge}<img src="{safe_html(p_url)}" loading="lazy"><div class="provider-badge">{safe_html(format_provider(p.provider))}</div></div>
-            <input type="hidden" name="poster_key" value="{safe_html(getattr(p, 'key', ''))}">
-            <input type="hidden" name="rating_key" value="{season.ratingKey}">
-            <input type="hidden" name="img_type" value="poster">
-            <button type="submit" class="btn">Download</button>
-        </form>"""
-    content += "</div></div>"
-
-    content += """<div id="tab-backgrounds" class="tab-content"><div class="background-grid">"""
-    for bg in backgrounds:
-        b_url = get_poster_url(bg)
-        sel_class = 'selected' if b_url == sel_bg else ''
-        badge = f'<div class="selected-badge">CURRENT</div>' if sel_class else ''
-        content += f"""
-        <form action="/download" method="post" class="background-card {sel_class}">
-            <div class="img-container">{badge}<img src="{safe_html(b_url)}" loading="lazy"><div class="provider-badge">{safe_html(format_provider(bg.provider))}</div></div>
-            <input type="hidden" name="poster_key" value="{safe_html(getattr(bg, 'key', ''))}">
-            <input type="hidden" name="rating_key" value="{season.ratingKey}">
-            <input type="hidden" name="img_type" value="background">
-            <button type="submit" class="btn">Download</button>
-        </form>"""
-    content += "</div></div>"
+    target_path = get_target_file_path(season, lib_title, ctx=ctx)
+    rel_path = target_rel_dir(target_path, ctx.base_dir)
     
-    return render_template_string(HTML_TOP + "{{ page_content }}" + HTML_BOTTOM, page_content=Markup(content), title=f"{show.title} - {season.title}", breadcrumbs=[(lib.title, f'/library/{lib.key}'), (show.title, f'/item/{show.ratingKey}'), (season.title, '#')], toggle_override=False)  # nosemgrep: render-template-string,explicit-unescape-with-markup
+    return render_template('artwork.html', path_label="Target", rel_path=rel_path,
+                           posters=art_cards(posters), backgrounds=art_cards(backgrounds),
+                           sel_poster=sel_poster, sel_bg=sel_bg, seasons=None, rating_key=season.ratingKey,
+                           title=f"{show.title} - {season.title}", breadcrumbs=[(lib_title, f'/library/{lib_key}'), (show.title, f'/item/{show.ratingKey}'), (season.title, '#')], toggle_override=False)
 
 @app.route('/download', methods=['POST'])
 def download():
@@ -1540,7 +2710,7 @@ def download():
         flash("Missing poster key.")
         return safe_referrer_redirect()
     try:
-        item = plex.fetchItem(int(rating_key))
+        item = fetch_item(rating_key)
         # Whitelist approach: fetch sources from the Plex API and find the one
         # whose key matches the submitted value.  img_url is derived from the
         # matched Plex API object (not from user input), breaking the SSRF
@@ -1554,14 +2724,10 @@ def download():
         if not img_url or not validate_image_url(img_url):
             flash("Blocked: image URL failed security validation.")
             return safe_referrer_redirect()
-        lib_title = item.section().title
+        lib_title = item_library(item)[1]
         save_path = get_target_file_path(item, lib_title, img_type=img_type)
         if save_path:
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            r = requests.get(img_url, stream=True)
-            if r.status_code == 200:
-                with open(save_path, 'wb') as f:
-                    for chunk in r.iter_content(1024): f.write(chunk)
+            if download_image(img_url, save_path):
                 save_download_history(rating_key, img_url, img_type)
                 flash(f"Saved {img_type}!")
             else: flash("Download failed.")
@@ -1582,4 +2748,7 @@ if __name__ == '__main__':
     _host  = os.environ.get('FLASK_RUN_HOST', '0.0.0.0')
     _port  = int(os.environ.get('FLASK_RUN_PORT', '5000'))
     _debug = os.environ.get('FLASK_DEBUG', '0') == '1'
-    app.run(host=_host, port=_port, debug=_debug)
+    if waitress and not _debug:
+        waitress.serve(app, host=_host, port=_port, threads=int(os.environ.get('WEB_THREADS', '16')))
+    else:
+        app.run(host=_host, port=_port, debug=_debug, threaded=True)
@@ -0,0 +1,31 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+DATA_DIR = tempfile.mkdtemp(prefix='ppd_test_')
+os.environ['DATA_DIR'] = DATA_DIR
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plex_poster_downloader as ppd  # noqa: E402
+
+
+class DeferredHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.hist_file = ppd.get_history_file()
+        if os.path.exists(self.hist_file): os.remove(self.hist_file)
+        ppd._history_cache.update(path=None, stamp=None, data=None, dirty=False)
+
+    def test_deferred_saves_before_history_file_exists(self):
+        for rk in (1, 2, 3):
+            ppd.save_download_history(rk, f"url{rk}", defer=True)
+        self.assertFalse(os.path.exists(self.hist_file))
+        self.assertEqual(ppd.load_history_data(copy=False)['_rating_keys'], {1, 2, 3})
+        ppd.flush_history()
+        with open(self.hist_file) as f:
+            self.assertEqual(json.load(f)['downloads'], {'1': 'url1', '2': 'url2', '3': 'url3'})
+
+
+if __name__ == '__main__':
+    unittest.main()